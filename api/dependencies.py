@@ -1,15 +1,19 @@
 # ============================================================
 # FILE: api/dependencies.py
 # ============================================================
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
 
 from config.settings import settings
-from app.models.user import User
-from app.models.employee import Employee
+from app.models.tenant_routing import allow_stale_reads
+from app.services.access_tokens import principal_from_claims
+from app.services.loaders import DepartmentNameLoader
+from app.services.principal_cache import EmployeeIdentity, Principal, principal_cache
+from app.services.pagination import InvalidCursor, PageParams, decode_cursor
+from app.services.permissions import EffectivePermissions, permission_cache
 
 security = HTTPBearer()
 
@@ -27,8 +31,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
-    """Get current user from JWT token"""
+) -> Principal:
+    """Get current user (slim, cached principal) from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -44,25 +48,70 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = await User.get(user_id)
-    if user is None:
+    # Scoped tokens authorize from their own claims while their epoch is current
+    if settings.SCOPED_TOKENS_ENABLED and "scp" in payload:
+        principal = principal_from_claims(payload)
+        if principal is not None:
+            return principal
+    
+    # Served from memory on the hot path; User/Employee writes invalidate it
+    principal = await principal_cache.get(user_id)
+    if principal is None:
         raise credentials_exception
     
-    return user
+    if not principal.can_authenticate:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account is disabled"
+        )
+    
+    return principal
 
-async def get_current_employee(current_user: User = Depends(get_current_user)) -> Employee:
+async def get_current_employee(current_user: Principal = Depends(get_current_user)) -> EmployeeIdentity:
     """Get employee record for current user"""
-    if not current_user.employee_id:
+    if not current_user.employee_id or current_user.employee is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Employee record not found"
         )
     
-    employee = await Employee.get(current_user.employee_id)
-    if not employee:
+    return current_user.employee
+
+async def get_permissions(current_user: Principal = Depends(get_current_user)) -> EffectivePermissions:
+    """Compiled permissions: from the scoped token if present, else the cache"""
+    if current_user.permissions is not None:
+        return current_user.permissions
+    return await permission_cache.get(current_user.id)
+
+def tolerate_staleness(seconds: int = settings.REPORTING_MAX_STALENESS_SECONDS):
+    """
+    Route dependency: hierarchy/report reads in this request may be served
+    by a secondary at most `seconds` behind (secondaryPreferred with
+    maxStalenessSeconds, floored at 90). User and grant reads stay on the
+    primary, as do loads of shared caches (principal, hierarchy, reporting
+    graph), which run under primary_reads().
+    """
+    async def dependency():
+        allow_stale_reads(seconds)
+    return dependency
+
+# For routes serving hierarchy trees, org charts and listings
+REPORTING_READS = Depends(tolerate_staleness())
+
+def get_department_loader() -> DepartmentNameLoader:
+    """Per-request department name loader (one $in query per batch)"""
+    return DepartmentNameLoader()
+
+def get_page_params(
+    limit: int = Query(settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page")
+) -> PageParams:
+    """Keyset pagination parameters shared by list endpoints"""
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Employee record not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
         )
-    
-    return employee
\ No newline at end of file
+    return PageParams(limit=limit, after=after)
@@ -0,0 +1,58 @@
+# ============================================================
+# FILE: api/middleware.py
+# ============================================================
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.settings import settings
+from config.database import Database
+from app.models.tenant_routing import bind_database, reset_database
+from app.services.tenants import tenant_registry
+
+class TenantMiddleware:
+    """
+    Binds the tenant database for each request.
+    Tenant comes from the TENANT_HEADER (explicit) or the Host domain,
+    resolved against the in-memory registry; suspended tenants get 403;
+    unmatched hosts use DEFAULT_TENANT_DATABASE if TENANT_FALLBACK_TO_DEFAULT.
+    Pure ASGI (no BaseHTTPMiddleware) so streaming responses keep the
+    binding and the per-request cost is a couple of dict lookups.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        tenant_id = headers.get(settings.TENANT_HEADER)
+        route = await tenant_registry.resolve(tenant_id, headers.get("host"))
+
+        if route is not None:
+            if route.is_blocked:
+                response = JSONResponse({"detail": "Tenant is suspended"}, status_code=403)
+                await response(scope, receive, send)
+                return
+            database_name = route.database_name
+        elif not tenant_id and settings.TENANT_FALLBACK_TO_DEFAULT:
+            database_name = settings.DEFAULT_TENANT_DATABASE
+        elif scope["path"].startswith("/api"):
+            response = JSONResponse({"detail": "Unknown tenant"}, status_code=404)
+            await response(scope, receive, send)
+            return
+        else:
+            # Docs, static files, health: nothing tenant-scoped to bind
+            await self.app(scope, receive, send)
+            return
+
+        # Exposed to handlers as request.state.tenant (None for the default)
+        scope.setdefault("state", {})["tenant"] = route
+        token = bind_database(await Database.tenant_database(database_name))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            reset_database(token)
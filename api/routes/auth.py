@@ -3,13 +3,15 @@
 # ============================================================
 from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel, EmailStr
-import bcrypt
 
 from app.models.user import User
 from app.models.employee import Employee
-from app.models.user_access import UserAccess
-from app.models.role import Role
-from api.dependencies import create_access_token, get_current_user, get_current_employee
+from app.services.access_tokens import scoped_token_claims
+from app.services.password_hasher import HasherSaturated, password_hasher
+from app.services.permissions import EffectivePermissions, permission_cache
+from app.services.principal_cache import EmployeeIdentity, Principal, principal_cache
+from config.settings import settings
+from api.dependencies import create_access_token, get_current_user, get_current_employee, get_permissions
 
 router = APIRouter()
 
@@ -33,8 +35,17 @@ async def login(request: LoginRequest):
             detail="Incorrect email or password"
         )
     
-    # Verify password
-    if not bcrypt.checkpw(request.password.encode(), user.password_hash.encode()):
+    # Verify password (off the event loop, on the bounded bcrypt pool)
+    try:
+        password_ok = await password_hasher.verify(request.password, user.password_hash)
+    except HasherSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -47,8 +58,16 @@ async def login(request: LoginRequest):
             detail="Account is disabled"
         )
     
-    # Create token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    # Create token (self-contained when scoped tokens are enabled). Identity
+    # and grants are compiled fresh, never from the per-process caches: a
+    # cached entry may predate a revocation that token_epoch already reflects.
+    if settings.SCOPED_TOKENS_ENABLED:
+        principal = await principal_cache.load(str(user.id))
+        compiled = await permission_cache.compile(user.id)
+        claims = scoped_token_claims(principal, compiled, user.token_epoch)
+    else:
+        claims = {"sub": str(user.id)}
+    access_token = create_access_token(data=claims)
     
     # Get employee info if exists
     employee = None
@@ -68,37 +87,12 @@ async def login(request: LoginRequest):
 
 @router.get("/me")
 async def get_me(
-    current_user: User = Depends(get_current_user),
-    current_employee: Employee = Depends(get_current_employee)
+    current_user: Principal = Depends(get_current_user),
+    current_employee: EmployeeIdentity = Depends(get_current_employee),
+    compiled: EffectivePermissions = Depends(get_permissions)
 ):
     """Get current user info with permissions"""
     
-    # Get all access grants
-    access_grants = await UserAccess.find(
-        UserAccess.user_id == current_user.id,
-        UserAccess.is_active == True
-    ).to_list()
-    
-    # Get roles
-    roles_info = []
-    all_permissions = {}
-    
-    for access in access_grants:
-        role = await Role.get(access.role_id)
-        if role:
-            roles_info.append({
-                "role": role.display_name,
-                "scope_type": access.scope_type,
-                "path_limit": access.path_limit
-            })
-            
-            # Merge permissions
-            for perm, value in role.permissions.items():
-                if perm not in all_permissions:
-                    all_permissions[perm] = value
-                else:
-                    all_permissions[perm] = all_permissions[perm] or value
-    
     return {
         "user": {
             "id": str(current_user.id),
@@ -112,6 +106,6 @@ async def get_me(
             "department_path": current_employee.department_path,
             "branch_path": current_employee.branch_path
         },
-        "roles": roles_info,
-        "permissions": all_permissions
+        "roles": compiled.roles_info(),
+        "permissions": compiled.permissions
     }
@@ -0,0 +1,115 @@
+# ============================================================
+# FILE: api/routes/branches.py
+# ============================================================
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.models.branch import Branch, BranchOccupancy
+from app.services.hierarchy_cache import hierarchy_cache
+from app.services.permissions import EffectivePermissions
+from api.dependencies import REPORTING_READS, get_current_user, get_permissions
+from api.routes.companies import MoveRequest, run_move
+
+router = APIRouter()
+
+# Occupancy reveals as much as an employee listing of the same scope
+VIEW_OCCUPANCY_PERMISSIONS = ("can_view_all_employees", "can_view_department_employees")
+
+def utilisation(occupancy: int, capacity: Optional[int]) -> Optional[float]:
+    """Occupied share of the seats, None when capacity is unknown"""
+    if not capacity:
+        return None
+    return round(occupancy / capacity, 4)
+
+async def _get_branch(branch_id: str) -> BranchOccupancy:
+    try:
+        branch = await Branch.find_one(
+            {"_id": ObjectId(branch_id), "is_deleted": False}
+        ).project(BranchOccupancy)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Branch not found")
+    
+    if not branch:
+        raise HTTPException(status_code=404, detail="Branch not found")
+    return branch
+
+@router.get("/{branch_id}/utilisation", dependencies=[REPORTING_READS])
+async def get_branch_utilisation(
+    branch_id: str,
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions)
+):
+    """Seating capacity vs. occupancy for a branch and its whole subtree (precomputed rollups)"""
+    
+    branch = await _get_branch(branch_id)
+    
+    company_path = await hierarchy_cache.path_of(branch.company_id)
+    if not any(
+        compiled.allows(permission, branch.materialized_path, "BRANCH", company_path, branch.company_id)
+        for permission in VIEW_OCCUPANCY_PERMISSIONS
+    ):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Subtree capacity: one range scan over the branch index (no employee reads)
+    subtree_capacity = branch.seating_capacity or 0
+    sub_branches = 0
+    if branch.materialized_path:
+        totals = await Branch.get_motor_collection().aggregate([
+            {"$match": {
+                "company_id": branch.company_id,
+                **Branch.subtree_query(branch.materialized_path, include_self=False),
+                "is_deleted": False
+            }},
+            {"$group": {
+                "_id": None,
+                "capacity": {"$sum": {"$ifNull": ["$seating_capacity", 0]}},
+                "branches": {"$sum": 1}
+            }}
+        ]).to_list(1)
+        if totals:
+            subtree_capacity += totals[0]["capacity"]
+            sub_branches = totals[0]["branches"]
+    
+    return {
+        "id": str(branch.id),
+        "name": branch.name,
+        "code": branch.code,
+        "path": branch.materialized_path,
+        "seating_capacity": branch.seating_capacity,
+        "occupancy": branch.current_occupancy,
+        "utilisation": utilisation(branch.current_occupancy, branch.seating_capacity),
+        "subtree": {
+            "branches": sub_branches + 1,
+            "seating_capacity": subtree_capacity or None,
+            "occupancy": branch.subtree_occupancy,
+            "utilisation": utilisation(branch.subtree_occupancy, subtree_capacity)
+        }
+    }
+
+@router.post("/{branch_id}/move")
+async def move_branch(
+    branch_id: str,
+    request: MoveRequest,
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions)
+):
+    """Re-parent a branch within its company (None = top level); its whole subtree moves with it"""
+    
+    branch = await _get_branch(branch_id)
+    parent = await _get_branch(request.new_parent_id) if request.new_parent_id else None
+    company_path = await hierarchy_cache.path_of(branch.company_id)
+    
+    # Must manage both the moved subtree and the destination; the top
+    # level belongs to the company itself
+    allowed = all(
+        compiled.allows("can_manage_branches", node.materialized_path, "BRANCH", company_path, node.company_id)
+        for node in (branch, parent) if node is not None
+    )
+    if parent is None:
+        allowed = allowed and compiled.allows("can_manage_branches", company_path, "COMPANY")
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return await run_move(Branch, branch.id, parent.id if parent else None)
@@ -1,81 +1,73 @@
 # ============================================================
 # FILE: api/routes/companies.py
 # ============================================================
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
 from bson import ObjectId
+from bson.errors import InvalidId
 
 from app.models.company import Company
 from app.models.department import Department
 from app.models.branch import Branch
-from api.dependencies import get_current_user
+from app.services.hierarchy_cache import CompanyNode, hierarchy_cache
+from app.services.hierarchy_moves import HierarchyMoveError, TransactionsUnavailable, move_subtree
+from app.services.pagination import PageParams, paginate
+from app.services.path_allocator import PathSegmentOverflow
+from app.services.permissions import EffectivePermissions
+from api.dependencies import REPORTING_READS, get_current_user, get_page_params, get_permissions
 
 router = APIRouter()
 
-def build_tree(items: List[Company]) -> List[Dict[str, Any]]:
-    """Build hierarchical tree from flat list"""
-    # Create lookup dict
-    item_dict = {str(item.id): {
-        "id": str(item.id),
-        "name": item.name,
-        "code": item.code,
-        "type": item.type,
-        "path": item.materialized_path,
-        "depth": item.depth,
-        "currency": item.currency,
-        "status": item.status,
-        "children": []
-    } for item in items}
-    
-    # Build tree
-    tree = []
-    for item in items:
-        item_data = item_dict[str(item.id)]
-        if item.parent_company_id is None:
-            # Root node
-            tree.append(item_data)
-        else:
-            # Child node - add to parent
-            parent_id = str(item.parent_company_id)
-            if parent_id in item_dict:
-                item_dict[parent_id]["children"].append(item_data)
-    
-    return tree
-
-@router.get("/hierarchy", response_model=List[Dict[str, Any]])
+@router.get("/hierarchy", response_model=List[Dict[str, Any]], dependencies=[REPORTING_READS])
 async def get_company_hierarchy(current_user = Depends(get_current_user)):
     """Get complete company hierarchy as tree"""
     
-    # Get all companies
-    companies = await Company.find(
-        Company.is_deleted == False
-    ).sort("+depth", "+materialized_path").to_list()
-    
-    if not companies:
-        return []
+    # Served from the per-tenant hierarchy cache
+    hierarchy = await hierarchy_cache.get()
     
-    # Build tree
-    tree = build_tree(companies)
-    
-    return tree
+    return hierarchy.tree()
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def list_companies(current_user = Depends(get_current_user)):
-    """List all companies (flat)"""
+@router.get("/", response_model=List[Dict[str, Any]], dependencies=[REPORTING_READS])
+async def list_companies(
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    current_user = Depends(get_current_user)
+):
+    """List all companies (flat, keyset-paginated by depth, path)"""
     
-    companies = await Company.find(
-        Company.is_deleted == False
-    ).sort("+depth", "+materialized_path").to_list()
+    hierarchy = await hierarchy_cache.get()
+    try:
+        after = (int(page.after[0]), str(page.after[1]), str(page.after[2])) if page.after else None
+    except (IndexError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    result = []
+    companies = paginate(
+        hierarchy.page(after, page.limit + 1),
+        page.limit,
+        response,
+        key=lambda company: list(company.sort_key)
+    )
+    
+    # Parent names come from the cached hierarchy; only parents that are
+    # no longer live (soft-deleted) need one batched lookup
+    parent_names = {}
+    missing_ids = set()
     for company in companies:
-        # Get parent name if exists
-        parent_name = None
         if company.parent_company_id:
-            parent = await Company.get(company.parent_company_id)
+            parent = hierarchy.get(str(company.parent_company_id))
             if parent:
-                parent_name = parent.name
-        
+                parent_names[parent.id] = parent.name
+            else:
+                missing_ids.add(company.parent_company_id)
+    if missing_ids:
+        missing_parents = await Company.find(
+            {"_id": {"$in": list(missing_ids)}}
+        ).project(CompanyNode).to_list()
+        parent_names.update({parent.id: parent.name for parent in missing_parents})
+    
+    result = []
+    for company in companies:
         result.append({
             "id": str(company.id),
             "name": company.name,
@@ -83,14 +75,14 @@ async def list_companies(current_user = Depends(get_current_user)):
             "type": company.type,
             "path": company.materialized_path,
             "depth": company.depth,
-            "parent_name": parent_name,
+            "parent_name": parent_names.get(company.parent_company_id),
             "status": company.status,
             "currency": company.currency
         })
     
     return result
 
-@router.get("/{company_id}")
+@router.get("/{company_id}", dependencies=[REPORTING_READS])
 async def get_company(
     company_id: str,
     current_user = Depends(get_current_user)
@@ -98,69 +90,92 @@ async def get_company(
     """Get single company details"""
     
     try:
-        company = await Company.get(ObjectId(company_id))
-    except:
+        company_oid = ObjectId(company_id)
+    except InvalidId:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    if not company:
+    # One round trip: parent, children and department/branch counts are
+    # joined on their indexes (parent_company_id, company_id)
+    pipeline = [
+        {"$match": {"_id": company_oid}},
+        {"$project": {
+            "name": 1, "code": 1, "type": 1, "status": 1, "materialized_path": 1, "depth": 1,
+            "is_group": 1, "currency": 1, "timezone": 1, "parent_company_id": 1
+        }},
+        {"$lookup": {
+            "from": Company.get_collection_name(),
+            "localField": "parent_company_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1, "code": 1}}],
+            "as": "parent"
+        }},
+        {"$lookup": {
+            "from": Company.get_collection_name(),
+            "localField": "_id",
+            "foreignField": "parent_company_id",
+            "pipeline": [
+                {"$match": {"is_deleted": False}},
+                {"$project": {"name": 1, "code": 1, "type": 1, "materialized_path": 1}}
+            ],
+            "as": "children"
+        }},
+        {"$lookup": {
+            "from": Department.get_collection_name(),
+            "localField": "_id",
+            "foreignField": "company_id",
+            "pipeline": [{"$match": {"is_deleted": False}}, {"$count": "total"}],
+            "as": "departments"
+        }},
+        {"$lookup": {
+            "from": Branch.get_collection_name(),
+            "localField": "_id",
+            "foreignField": "company_id",
+            "pipeline": [{"$match": {"is_deleted": False}}, {"$count": "total"}],
+            "as": "branches"
+        }}
+    ]
+    rows = await Company.get_motor_collection().aggregate(pipeline).to_list(1)
+    
+    if not rows:
         raise HTTPException(status_code=404, detail="Company not found")
+    company = rows[0]
     
-    # Get parent if exists
     parent = None
-    if company.parent_company_id:
-        parent_company = await Company.get(company.parent_company_id)
-        if parent_company:
-            parent = {
-                "id": str(parent_company.id),
-                "name": parent_company.name,
-                "code": parent_company.code
-            }
-    
-    # Get children
-    children = await Company.find(
-        Company.parent_company_id == company.id,
-        Company.is_deleted == False
-    ).to_list()
+    if company["parent"]:
+        parent_company = company["parent"][0]
+        parent = {
+            "id": str(parent_company["_id"]),
+            "name": parent_company["name"],
+            "code": parent_company["code"]
+        }
     
     children_list = [{
-        "id": str(child.id),
-        "name": child.name,
-        "code": child.code,
-        "type": child.type,
-        "path": child.materialized_path
-    } for child in children]
-    
-    # Count departments and branches
-    dept_count = await Department.find(
-        Department.company_id == company.id,
-        Department.is_deleted == False
-    ).count()
-    
-    branch_count = await Branch.find(
-        Branch.company_id == company.id,
-        Branch.is_deleted == False
-    ).count()
+        "id": str(child["_id"]),
+        "name": child["name"],
+        "code": child["code"],
+        "type": child["type"],
+        "path": child.get("materialized_path")
+    } for child in company["children"]]
     
     return {
-        "id": str(company.id),
-        "name": company.name,
-        "code": company.code,
-        "type": company.type,
-        "status": company.status,
-        "materialized_path": company.materialized_path,
-        "depth": company.depth,
-        "is_group": company.is_group,
-        "currency": company.currency,
-        "timezone": company.timezone,
+        "id": str(company["_id"]),
+        "name": company["name"],
+        "code": company["code"],
+        "type": company["type"],
+        "status": company.get("status"),
+        "materialized_path": company.get("materialized_path"),
+        "depth": company.get("depth", 0),
+        "is_group": company.get("is_group"),
+        "currency": company.get("currency"),
+        "timezone": company.get("timezone"),
         "parent": parent,
         "children": children_list,
         "stats": {
-            "departments": dept_count,
-            "branches": branch_count
+            "departments": company["departments"][0]["total"] if company["departments"] else 0,
+            "branches": company["branches"][0]["total"] if company["branches"] else 0
         }
     }
 
-
 # @router.get("/{company_id}/hierarchy", response_model=Dict[str, Any])
 # async def get_company_subtree(
 #     company_id: str,
@@ -204,60 +219,58 @@ async def get_company(
 #     return subtree
 
 
-@router.get("/{company_id}/hierarchy", response_model=Dict[str, Any])
+@router.get("/{company_id}/hierarchy", response_model=Dict[str, Any], dependencies=[REPORTING_READS])
 async def get_company_subtree(
     company_id: str,
     current_user = Depends(get_current_user)
 ):
     """Get hierarchy starting from a specific company"""
 
-    try:
-        root_company = await Company.get(ObjectId(company_id))
-    except:
-        raise HTTPException(status_code=404, detail="Company not found")
+    # Deleted and unknown companies are not in the cache
+    hierarchy = await hierarchy_cache.get()
+    subtree = hierarchy.subtree(company_id)
 
-    if not root_company or root_company.is_deleted:
+    if subtree is None:
         raise HTTPException(status_code=404, detail="Company not found")
 
-    # Fetch descendants
-    if root_company.materialized_path:
-        companies = await Company.find(
-            {
-                "materialized_path": {
-                    "$regex": f"^{root_company.materialized_path}"
-                }
-            },
-            Company.is_deleted == False
-        ).sort("+depth", "+materialized_path").to_list()
-    else:
-        companies = await Company.find(
-            Company.is_deleted == False
-        ).sort("+depth", "+materialized_path").to_list()
+    return subtree
 
-    if not companies:
-        return {}
 
-    # Build node map
-    node_map = {}
-    for item in companies:
-        node_map[str(item.id)] = {
-            "id": str(item.id),
-            "name": item.name,
-            "code": item.code,
-            "type": item.type,
-            "path": item.materialized_path,
-            "depth": item.depth,
-            "currency": item.currency,
-            "status": item.status,
-            "children": []
-        }
+class MoveRequest(BaseModel):
+    new_parent_id: Optional[str] = None  # None = top level (departments/branches only)
 
-    # Attach children
-    for item in companies:
-        if item.parent_company_id:
-            pid = str(item.parent_company_id)
-            if pid in node_map:
-                node_map[pid]["children"].append(node_map[str(item.id)])
+@router.post("/{company_id}/move")
+async def move_company(
+    company_id: str,
+    request: MoveRequest,
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions)
+):
+    """Re-parent a company; its whole subtree moves with it"""
+
+    hierarchy = await hierarchy_cache.get()
+    company = hierarchy.get(company_id)
+    parent = hierarchy.get(request.new_parent_id) if request.new_parent_id else None
+    if company is None or (request.new_parent_id and parent is None):
+        raise HTTPException(status_code=404, detail="Company not found")
+
+    # Must manage both the moved subtree and the destination
+    for node in (company, parent):
+        if node is not None and not compiled.allows("can_manage_company", node.materialized_path, "COMPANY"):
+            raise HTTPException(status_code=403, detail="Access denied")
 
-    # Return subtree root
-    return node_map.get(str(root_company.id), {})
+    return await run_move(Company, company.id, parent.id if parent else None)
+
+
+async def run_move(model, node_id, new_parent_id):
+    """move_subtree with its failures mapped to HTTP errors (shared by the hierarchy routes)"""
+    try:
+        return await move_subtree(model, node_id, new_parent_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except HierarchyMoveError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except PathSegmentOverflow as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except TransactionsUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
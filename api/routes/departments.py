@@ -0,0 +1,180 @@
+# ============================================================
+# FILE: api/routes/departments.py
+# ============================================================
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from config.settings import settings
+from app.models.department import Department, DepartmentHeadcount, DepartmentNode
+from app.models.materialized_path import ancestor_paths
+from app.services import closure
+from app.services.hierarchy_cache import hierarchy_cache
+from app.services.permissions import EffectivePermissions
+from api.dependencies import REPORTING_READS, get_current_user, get_permissions
+from api.routes.companies import MoveRequest, run_move
+
+router = APIRouter()
+
+# Headcounts reveal as much as an employee listing of the same scope;
+# the department tree itself is visible to the same grants
+VIEW_HEADCOUNT_PERMISSIONS = ("can_view_all_employees", "can_view_department_employees")
+
+ACTIVE = {"is_deleted": False}
+
+
+async def _get_node(department_id: str) -> DepartmentNode:
+    try:
+        dept = await Department.find_one(
+            {"_id": ObjectId(department_id), **ACTIVE}
+        ).project(DepartmentNode)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Department not found")
+    if not dept:
+        raise HTTPException(status_code=404, detail="Department not found")
+    return dept
+
+
+async def _nodes_in_order(ids: List[ObjectId]) -> List[DepartmentNode]:
+    """Departments by id, in the order of ids (deleted ones skipped)"""
+    found = {
+        dept.id: dept
+        for dept in await Department.find({"_id": {"$in": ids}, **ACTIVE}).project(DepartmentNode).to_list()
+    } if ids else {}
+    return [found[node_id] for node_id in ids if node_id in found]
+
+
+def _node_info(dept: DepartmentNode) -> Dict[str, Any]:
+    return {
+        "id": str(dept.id),
+        "name": dept.name,
+        "code": dept.code,
+        "path": dept.materialized_path,
+        "depth": dept.depth
+    }
+
+
+def _visible(compiled: EffectivePermissions, dept: DepartmentNode, company_path: Optional[str]) -> bool:
+    return any(
+        compiled.allows(permission, dept.materialized_path, "DEPARTMENT", company_path, dept.company_id)
+        for permission in VIEW_HEADCOUNT_PERMISSIONS
+    )
+
+@router.get("/{department_id}/headcount", dependencies=[REPORTING_READS])
+async def get_department_headcount(
+    department_id: str,
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions)
+):
+    """Active employees in a department and in its whole subtree (precomputed rollups)"""
+    
+    try:
+        dept = await Department.find_one(
+            {"_id": ObjectId(department_id), "is_deleted": False}
+        ).project(DepartmentHeadcount)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Department not found")
+    
+    if not dept:
+        raise HTTPException(status_code=404, detail="Department not found")
+    
+    company_path = await hierarchy_cache.path_of(dept.company_id)
+    if not any(
+        compiled.allows(permission, dept.materialized_path, "DEPARTMENT", company_path, dept.company_id)
+        for permission in VIEW_HEADCOUNT_PERMISSIONS
+    ):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {
+        "id": str(dept.id),
+        "name": dept.name,
+        "code": dept.code,
+        "path": dept.materialized_path,
+        "headcount": dept.headcount,
+        "subtree_headcount": dept.subtree_headcount,
+        "headcount_limit": dept.headcount_limit
+    }
+
+
+@router.get("/{department_id}/ancestors", dependencies=[REPORTING_READS])
+async def get_department_ancestors(
+    department_id: str,
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions)
+):
+    """Departments above this one, nearest first (closure table when enabled)"""
+
+    dept = await _get_node(department_id)
+    company_path = await hierarchy_cache.path_of(dept.company_id)
+    if not _visible(compiled, dept, company_path):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if settings.HIERARCHY_CLOSURE_ENABLED:
+        ancestors = await _nodes_in_order(await closure.ancestor_ids(Department, dept.id))
+    else:
+        ancestors = await Department.find(
+            {"company_id": dept.company_id, "materialized_path": {"$in": ancestor_paths(dept.materialized_path)}, **ACTIVE}
+        ).sort("-materialized_path").project(DepartmentNode).to_list()
+
+    return [_node_info(node) for node in ancestors if _visible(compiled, node, company_path)]
+
+
+@router.get("/{department_id}/descendants", dependencies=[REPORTING_READS])
+async def get_department_descendants(
+    department_id: str,
+    max_depth: Optional[int] = Query(None, ge=1, description="Levels below the department; omit for all"),
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions)
+):
+    """Departments below this one, at most max_depth levels down (closure table when enabled)"""
+
+    dept = await _get_node(department_id)
+    company_path = await hierarchy_cache.path_of(dept.company_id)
+    if not _visible(compiled, dept, company_path):
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if settings.HIERARCHY_CLOSURE_ENABLED:
+        # One indexed range on (ancestor, distance), breadth-first
+        descendants = await _nodes_in_order(await closure.descendant_ids(Department, dept.id, max_depth))
+    else:
+        query = {
+            "company_id": dept.company_id,
+            **Department.subtree_query(dept.materialized_path, include_self=False),
+            **ACTIVE
+        }
+        if max_depth is not None:
+            query["depth"] = {"$lte": dept.depth + max_depth}
+        descendants = await Department.find(query).sort(
+            "+depth", "+materialized_path"
+        ).project(DepartmentNode).to_list()
+
+    # Depth-limited grants may cover the department but not everything below it
+    return [_node_info(node) for node in descendants if _visible(compiled, node, company_path)]
+
+
+@router.post("/{department_id}/move")
+async def move_department(
+    department_id: str,
+    request: MoveRequest,
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions)
+):
+    """Re-parent a department within its company (None = top level); its whole subtree moves with it"""
+
+    dept = await _get_node(department_id)
+    parent = await _get_node(request.new_parent_id) if request.new_parent_id else None
+    company_path = await hierarchy_cache.path_of(dept.company_id)
+
+    # Must manage both the moved subtree and the destination; the top
+    # level belongs to the company itself
+    allowed = all(
+        compiled.allows("can_manage_departments", node.materialized_path, "DEPARTMENT", company_path, node.company_id)
+        for node in (dept, parent) if node is not None
+    )
+    if parent is None:
+        allowed = allowed and compiled.allows("can_manage_departments", company_path, "COMPANY")
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return await run_move(Department, dept.id, parent.id if parent else None)
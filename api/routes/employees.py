@@ -1,38 +1,30 @@
 # ============================================================
 # FILE: api/routes/employees.py
 # ============================================================
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
+from datetime import datetime, timezone
 from bson import ObjectId
-
-from app.models.employee import Employee
-from app.models.user_access import UserAccess
-from app.models.role import Role
-from app.models.department import Department
-from api.dependencies import get_current_user, get_current_employee
+from bson.errors import InvalidId
+from fastapi.responses import StreamingResponse
+
+from config.settings import settings
+from app.models.employee import Employee, EmployeeSummary
+from app.services.exports import iter_batches, iter_csv, iter_ndjson, map_batches
+from app.services.hierarchy_cache import hierarchy_cache
+from app.services.loaders import DepartmentNameLoader
+from app.services.org_graph import org_graph_cache
+from app.services.pagination import PageParams, paginate
+from app.services.permissions import EffectivePermissions
+from api.dependencies import (
+    REPORTING_READS, get_current_user, get_current_employee, get_department_loader, get_page_params,
+    get_permissions
+)
 
 router = APIRouter()
 
-async def check_permission(user_id: ObjectId, permission: str, resource_path: str) -> bool:
-    """Check if user has permission for resource"""
-    access_grants = await UserAccess.find(
-        UserAccess.user_id == user_id,
-        UserAccess.is_active == True
-    ).to_list()
-    
-    for access in access_grants:
-        role = await Role.get(access.role_id)
-        if not role or not role.permissions.get(permission):
-            continue
-        
-        # Check if resource is within scope
-        if access.path_limit == "*":
-            return True
-        
-        if resource_path.startswith(access.path_limit):
-            return True
-    
-    return False
+# Either permission lets a user list employees inside the grant's scope
+VIEW_EMPLOYEE_PERMISSIONS = ("can_view_all_employees", "can_view_department_employees")
 
 # @router.get("/", response_model=List[dict])
 # async def list_employees(
@@ -190,86 +182,80 @@ async def check_permission(user_id: ObjectId, permission: str, resource_path: st
 #     return result
 
 
-@router.get("/", response_model=List[dict])
+def cursor_object_id(page: PageParams, position: int = 0) -> Optional[ObjectId]:
+    """ObjectId stored in a keyset cursor, 400 if it is malformed"""
+    if not page.after:
+        return None
+    try:
+        return ObjectId(page.after[position])
+    except (IndexError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def department_keyset(page: PageParams) -> dict:
+    """Rows after the (department_path, id) cursor; null paths sort first"""
+    if not page.after:
+        return {}
+    path, after_id = page.after[0], cursor_object_id(page, 1)
+    if path is not None and not isinstance(path, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"department_path": {"$ne": None} if path is None else {"$gt": path}},
+        {"department_path": path, "_id": {"$gt": after_id}}
+    ]}
+
+@router.get("/", response_model=List[dict], dependencies=[REPORTING_READS])
 async def list_employees(
+    response: Response,
+    page: PageParams = Depends(get_page_params),
     current_user = Depends(get_current_user),
-    current_employee = Depends(get_current_employee)
+    compiled: EffectivePermissions = Depends(get_permissions),
+    current_employee = Depends(get_current_employee),
+    department_loader: DepartmentNameLoader = Depends(get_department_loader)
 ):
     """List employees based on user's access"""
 
-    access_grants = await UserAccess.find(
-        UserAccess.user_id == current_user.id,
-        UserAccess.is_active == True
-    ).to_list()
-
-    if not access_grants:
-        return [current_employee]
-
-    can_view_all = False
-    can_view_department = False
-    can_view_own = False
-
-    accessible_paths = []
-
-    for access in access_grants:
-        role = await Role.get(access.role_id)
-        if not role:
-            continue
-
-        perms = role.permissions or {}
-
-        if perms.get("can_view_all_employees"):
-            can_view_all = True
-
-        if perms.get("can_view_department_employees"):
-            can_view_department = True
-
-        if perms.get("can_view_own_data"):
-            can_view_own = True
-
-        if can_view_department:
-            accessible_paths.append(access.path_limit)
-
     # ---- Enforce permission rules ----
 
-    if can_view_all:
+    # One filter for every scope that grants a view permission:
+    # {} = unrestricted, None = no scoped view access
+    scope = compiled.scope_filter(
+        VIEW_EMPLOYEE_PERMISSIONS, "department_path", "DEPARTMENT", await hierarchy_cache.company_paths()
+    )
+
+    if scope is not None:
+        # Keyset page on (department_path, _id): walks the same index as the
+        # scope's path ranges, no skip cost on deep pages
         employees = await Employee.find(
+            scope,
+            department_keyset(page),
             Employee.employment_status == "active",
             Employee.is_deleted == False
-        ).to_list()
+        ).sort("+department_path", "+_id").limit(page.limit + 1).project(EmployeeSummary).to_list()
+        employees = paginate(
+            employees, page.limit, response, key=lambda emp: [emp.department_path, str(emp.id)]
+        )
 
-    elif can_view_department and accessible_paths:
-        employees = []
-        for path in accessible_paths:
-            dept_employees = await Employee.find(
-                Employee.department_path.startswith(path),
-                Employee.employment_status == "active",
-                Employee.is_deleted == False
-            ).to_list()
-            employees.extend(dept_employees)
-
-    elif can_view_own:
-        employees = [current_employee]
+    elif compiled.has("can_view_own_data") or not compiled.grants:
+        # Self only; the cached identity lacks listing fields, fetch them
+        employees = await Employee.find(
+            Employee.id == current_employee.id
+        ).project(EmployeeSummary).to_list()
 
     else:
         raise HTTPException(status_code=403, detail="Access denied")
 
     # ---- Format response ----
 
+    dept_names = await department_loader.names(emp.department_id for emp in employees)
+
     result = []
     for emp in employees:
-        dept_name = "N/A"
-        if emp.department_id:
-            dept = await Department.get(emp.department_id)
-            if dept:
-                dept_name = dept.name
-
         result.append({
             "id": str(emp.id),
             "employee_code": emp.employee_code,
             "display_name": emp.display_name,
             "work_email": emp.work_email,
-            "department": dept_name,
+            "department": dept_names.get(emp.department_id, "N/A"),
             "department_path": emp.department_path,
             "employment_status": emp.employment_status,
             "joining_date": emp.joining_date.isoformat() if emp.joining_date else None
@@ -279,45 +265,158 @@ async def list_employees(
 
 
 
-@router.get("/reporting-to-me", response_model=List[dict])
-async def get_my_reports(current_employee = Depends(get_current_employee)):
-    """Get employees reporting to current user"""
+async def find_reports(
+    manager_id: ObjectId,
+    depth: int = 1,
+    after: Optional[tuple] = None,
+    limit: Optional[int] = None
+) -> List[tuple]:
+    """
+    Active employees whose primary reporting chain reaches manager_id
+    within `depth` levels, as (employee, level) pairs ordered by level,
+    then id. `after` is the (level, id) of the last row already returned.
+    """
+    active = {"employment_status": "active", "is_deleted": False}
+
+    if depth == 1:
+        # Served by the reporting_lines.manager_id + is_primary multikey index
+        query = Employee.find(
+            {"reporting_lines": {"$elemMatch": {"manager_id": manager_id, "is_primary": True}}},
+            {"_id": {"$gt": after[1]}} if after else {},
+            active
+        ).sort("+_id")
+        if limit is not None:
+            query = query.limit(limit)
+        reports = await query.project(EmployeeSummary).to_list()
+        return [(emp, 1) for emp in reports]
+
+    # Deeper walks run over the in-memory reporting graph; only the page
+    # of reports being returned is fetched
+    graph = await org_graph_cache.get()
+    levels = [
+        (level, emp_id)
+        for emp_id, level in graph.all_reports(manager_id, max_depth=depth, primary_only=True)
+    ]
+    levels.sort()
+    if after:
+        levels = [item for item in levels if item > tuple(after)]
+    if limit is not None:
+        levels = levels[:limit]
+
+    found = {
+        emp.id: emp
+        for emp in await Employee.find(
+            {"_id": {"$in": [emp_id for _, emp_id in levels]}}, active
+        ).project(EmployeeSummary).to_list()
+    }
+    return [(found[emp_id], level) for level, emp_id in levels if emp_id in found]
+
+@router.get("/reporting-to-me", response_model=List[dict], dependencies=[REPORTING_READS])
+async def get_my_reports(
+    response: Response,
+    depth: int = Query(1, ge=1, le=settings.MAX_REPORTING_DEPTH),
+    page: PageParams = Depends(get_page_params),
+    current_employee = Depends(get_current_employee),
+    department_loader: DepartmentNameLoader = Depends(get_department_loader)
+):
+    """Get employees reporting to current user (depth > 1 includes indirect reports)"""
     
-    # Find employees where current employee is their manager
-    reports = await Employee.find(
-        Employee.employment_status == "active",
-        Employee.is_deleted == False
-    ).to_list()
+    after = None
+    if page.after:
+        try:
+            after = (int(page.after[0]), cursor_object_id(page, 1))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    reports = await find_reports(current_employee.id, depth, after=after, limit=page.limit + 1)
+    reports = paginate(reports, page.limit, response, key=lambda item: [item[1], str(item[0].id)])
+    
+    dept_names = await department_loader.names(emp.department_id for emp, _ in reports)
     
-    # Filter those who report to current user
     my_reports = []
-    for emp in reports:
-        for reporting_line in emp.reporting_lines:
-            if reporting_line.manager_id == current_employee.id and reporting_line.is_primary:
-                # Get department
-                dept_name = "N/A"
-                if emp.department_id:
-                    dept = await Department.get(emp.department_id)
-                    if dept:
-                        dept_name = dept.name
-                
-                my_reports.append({
-                    "id": str(emp.id),
-                    "employee_code": emp.employee_code,
-                    "display_name": emp.display_name,
-                    "work_email": emp.work_email,
-                    "department": dept_name,
-                    "joining_date": emp.joining_date.isoformat() if emp.joining_date else None
-                })
-                break
+    for emp, level in reports:
+        my_reports.append({
+            "id": str(emp.id),
+            "employee_code": emp.employee_code,
+            "display_name": emp.display_name,
+            "work_email": emp.work_email,
+            "department": dept_names.get(emp.department_id, "N/A"),
+            "joining_date": emp.joining_date.isoformat() if emp.joining_date else None,
+            "level": level
+        })
     
     return my_reports
 
+EXPORT_FIELDS = [
+    "id",
+    "employee_code",
+    "display_name",
+    "work_email",
+    "department",
+    "department_path",
+    "employment_status",
+    "joining_date"
+]
+
+@router.get("/export", dependencies=[REPORTING_READS])
+async def export_employees(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user = Depends(get_current_user),
+    compiled: EffectivePermissions = Depends(get_permissions),
+    department_loader: DepartmentNameLoader = Depends(get_department_loader)
+):
+    """Stream every active employee in the caller's export scope (NDJSON or CSV)"""
+
+    scope = compiled.scope_filter(
+        ["can_export_data"], "department_path", "DEPARTMENT", await hierarchy_cache.company_paths()
+    )
+    if scope is None:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    # Iterated lazily: the Motor cursor pulls one batch at a time. Ordered
+    # like the listing, on the (department_path, _id) index the scope's
+    # path ranges already walk, so no in-memory sort
+    rows = Employee.find(
+        scope,
+        Employee.employment_status == "active",
+        Employee.is_deleted == False,
+        batch_size=settings.EXPORT_BATCH_SIZE
+    ).sort("+department_path", "+_id").project(EmployeeSummary)
+
+    async def format_batch(batch):
+        dept_names = await department_loader.names(emp.department_id for emp in batch)
+        return [{
+            "id": str(emp.id),
+            "employee_code": emp.employee_code,
+            "display_name": emp.display_name,
+            "work_email": emp.work_email,
+            "department": dept_names.get(emp.department_id, "N/A"),
+            "department_path": emp.department_path,
+            "employment_status": emp.employment_status.value,
+            "joining_date": emp.joining_date.isoformat() if emp.joining_date else None
+        } for emp in batch]
+
+    batches = map_batches(iter_batches(rows, settings.EXPORT_BATCH_SIZE), format_batch)
+
+    if format == "csv":
+        return StreamingResponse(
+            iter_csv(batches, EXPORT_FIELDS),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="employees.csv"'}
+        )
+    return StreamingResponse(
+        iter_ndjson(batches),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="employees.ndjson"'}
+    )
+
 @router.get("/{employee_id}")
 async def get_employee(
     employee_id: str,
     current_user = Depends(get_current_user),
-    current_employee = Depends(get_current_employee)
+    current_employee = Depends(get_current_employee),
+    compiled: EffectivePermissions = Depends(get_permissions),
+    department_loader: DepartmentNameLoader = Depends(get_department_loader)
 ):
     """Get employee details"""
     
@@ -331,10 +430,9 @@ async def get_employee(
         raise HTTPException(status_code=404, detail="Employee not found")
     
     # Check permission
-    can_view = await check_permission(
-        current_user.id,
-        "can_view_all_employees",
-        emp.department_path or ""
+    can_view = compiled.allows(
+        "can_view_all_employees", emp.department_path, "DEPARTMENT",
+        await hierarchy_cache.path_of(emp.company_id), emp.company_id
     )
     
     # Can always view self
@@ -345,11 +443,7 @@ async def get_employee(
         raise HTTPException(status_code=403, detail="Access denied")
     
     # Get department
-    dept_name = "N/A"
-    if emp.department_id:
-        dept = await Department.get(emp.department_id)
-        if dept:
-            dept_name = dept.name
+    dept_name = await department_loader.name(emp.department_id)
     
     return {
         "id": str(emp.id),
@@ -364,4 +458,62 @@ async def get_employee(
         "employment_type": emp.employment_type,
         "employment_status": emp.employment_status,
         "joining_date": emp.joining_date.isoformat() if emp.joining_date else None
-    }
\ No newline at end of file
+    }
+
+@router.get("/{employee_id}/chain-of-command", response_model=List[dict])
+async def get_chain_of_command(
+    employee_id: str,
+    as_of: Optional[datetime] = Query(None, description="Reporting lines effective at (default: now)"),
+    current_employee = Depends(get_current_employee),
+    compiled: EffectivePermissions = Depends(get_permissions),
+    department_loader: DepartmentNameLoader = Depends(get_department_loader)
+):
+    """
+    Managers above an employee along the primary reporting line, nearest
+    first, up to the top of the organisation. Walks the cached reporting
+    graph, so the number of queries does not depend on the chain length.
+    """
+    
+    try:
+        emp = await Employee.find_one(
+            {"_id": ObjectId(employee_id), "is_deleted": False}
+        ).project(EmployeeSummary)
+    except InvalidId:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    
+    if not emp:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    
+    if emp.id != current_employee.id and not compiled.allows(
+        "can_view_all_employees", emp.department_path, "DEPARTMENT",
+        await hierarchy_cache.path_of(emp.company_id), emp.company_id
+    ):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Reporting lines store naive UTC; compare like with like
+    if as_of is None:
+        as_of = datetime.utcnow()
+    elif as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    graph = await org_graph_cache.get()
+    chain = graph.chain_of_command(emp.id, as_of=as_of)
+    
+    managers = {
+        manager.id: manager
+        for manager in await Employee.find({"_id": {"$in": chain}}).project(EmployeeSummary).to_list()
+    }
+    dept_names = await department_loader.names(manager.department_id for manager in managers.values())
+    
+    return [
+        {
+            "id": str(manager_id),
+            "employee_code": managers[manager_id].employee_code,
+            "display_name": managers[manager_id].display_name,
+            "work_email": managers[manager_id].work_email,
+            "department": dept_names.get(managers[manager_id].department_id, "N/A"),
+            "level": level
+        }
+        for level, manager_id in enumerate(chain, start=1)
+        if manager_id in managers
+    ]
@@ -1,13 +1,16 @@
 from beanie import Document
-from pydantic import Field, validator
+from pydantic import BaseModel, Field, validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, ClassVar
 # from bson import ObjectId # Not needed with Beanie's PydanticObjectId in Pydantic v2
 from beanie import PydanticObjectId
 from pydantic import field_validator
 import re
 
-class Branch(Document):
+from app.models.materialized_path import MaterializedPathMixin
+from app.models.tenant_routing import TenantRoutedMixin
+
+class Branch(TenantRoutedMixin, MaterializedPathMixin, Document):
     """
     Branch/Location hierarchy model.
     Represents physical office locations and geographic presence.
@@ -143,10 +146,14 @@ class Branch(Document):
     # For: Capacity planning, hot-desking
     
     current_occupancy: int = Field(default=0)
-    # Current number of employees
-    # Updated via trigger/scheduled job
+    # Current number of active employees placed directly at this branch
+    # Kept by the rollup engine ($inc on employee events + periodic recount)
     # Denormalized for performance
     
+    subtree_occupancy: int = Field(default=0)
+    # Active employees at this branch and all sub-branches
+    # Maintained alongside current_occupancy
+    
     parking_spaces: Optional[int] = None
     # Available parking spots
     
@@ -324,6 +331,10 @@ class Branch(Document):
                 raise ValueError(f'security_level must be one of {allowed}')
         return v
     
+    # Reads may be served by a secondary when the request tolerates staleness
+    stale_reads_ok: ClassVar[bool] = True
+    parent_field: ClassVar[str] = "parent_branch_id"
+    
     class Settings:
         name = "branches"
         
@@ -342,4 +353,16 @@ class Branch(Document):
             "is_headquarters",  # Quick HQ lookup
             [("address.city", 1), ("address.state", 1)],  # Location queries
             "timezone",  # Timezone-based queries
-        ]
\ No newline at end of file
+        ]
+
+
+class BranchOccupancy(BaseModel):
+    """Projection serving utilisation reads (capacity and rollup fields only)"""
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    code: str
+    company_id: PydanticObjectId
+    materialized_path: Optional[str] = None
+    seating_capacity: Optional[int] = None
+    current_occupancy: int = 0
+    subtree_occupancy: int = 0
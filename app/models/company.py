@@ -171,10 +171,10 @@
 #             "type",
 #         ]
 
-from beanie import Document
+from beanie import Document, after_event, Insert, Replace, Save, SaveChanges, Update, Delete
 from pydantic import Field, validator
 from datetime import datetime
-from typing import Optional
+from typing import Optional, ClassVar
 # from bson import ObjectId # Not needed with Beanie's PydanticObjectId in Pydantic v2
 from beanie import PydanticObjectId
 from pydantic import field_validator
@@ -182,7 +182,10 @@ from pydantic import field_validator
 
 import re
 
-class Company(Document):
+from app.models.materialized_path import MaterializedPathMixin
+from app.models.tenant_routing import TenantRoutedMixin
+
+class Company(TenantRoutedMixin, MaterializedPathMixin, Document):
     """
     Company hierarchy model.
     Each tenant has separate database.
@@ -380,6 +383,23 @@ class Company(Document):
             raise ValueError('fiscal_year_start must be between 1 and 12')
         return v
     
+    # ==================== CACHE SYNC ====================
+    @after_event(Insert, Replace, Save, SaveChanges, Update)
+    def sync_hierarchy_cache(self):
+        """Patch the in-process hierarchy cache (soft-deletes drop the node)"""
+        from app.services.hierarchy_cache import hierarchy_cache
+        hierarchy_cache.apply(self)
+    
+    @after_event(Delete)
+    def evict_from_hierarchy_cache(self):
+        """Drop hard-deleted companies from the hierarchy cache"""
+        from app.services.hierarchy_cache import hierarchy_cache
+        hierarchy_cache.evict(self.id)
+    
+    # Reads may be served by a secondary when the request tolerates staleness
+    stale_reads_ok: ClassVar[bool] = True
+    parent_field: ClassVar[str] = "parent_company_id"
+    
     class Settings:
         name = "companies"
         
@@ -56,15 +56,18 @@
 #         ]
 
 from beanie import Document
-from pydantic import Field, validator
+from pydantic import BaseModel, Field, validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, ClassVar
 # from bson import ObjectId # Not needed with Beanie's PydanticObjectId in Pydantic v2
 from beanie import PydanticObjectId
 from pydantic import field_validator
 import re
 
-class Department(Document):
+from app.models.materialized_path import MaterializedPathMixin
+from app.models.tenant_routing import TenantRoutedMixin
+
+class Department(TenantRoutedMixin, MaterializedPathMixin, Document):
     """
     Department hierarchy model.
     Represents organizational structure (reporting lines, functional areas).
@@ -144,10 +147,14 @@ class Department(Document):
     
     # ==================== METRICS & TRACKING ====================
     headcount: int = Field(default=0)
-    # Current number of employees
-    # Updated via trigger/scheduled job
+    # Current number of active employees placed directly in this department
+    # Kept by the rollup engine ($inc on employee events + periodic recount)
     # Denormalized for performance
     
+    subtree_headcount: int = Field(default=0)
+    # Active employees in this department and all sub-departments
+    # Maintained alongside headcount
+    
     headcount_limit: Optional[int] = None
     # Maximum allowed employees
     # Null = no limit
@@ -284,6 +291,10 @@ class Department(Document):
             raise ValueError('materialized_path must match pattern: 001.002.003')
         return v
     
+    # Reads may be served by a secondary when the request tolerates staleness
+    stale_reads_ok: ClassVar[bool] = True
+    parent_field: ClassVar[str] = "parent_department_id"
+    
     class Settings:
         name = "departments"
         
@@ -300,4 +311,25 @@ class Department(Document):
             [("company_id", 1), ("status", 1), ("is_deleted", 1)],  # Active departments
             [("company_id", 1), ("materialized_path", 1)],  # Hierarchy within company
             "primary_branch_id",  # Departments at a location
-        ]
\ No newline at end of file
+        ]
+
+class DepartmentHeadcount(BaseModel):
+    """Projection serving headcount dashboards (rollup fields only)"""
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    code: str
+    company_id: PydanticObjectId
+    materialized_path: Optional[str] = None
+    headcount: int = 0
+    subtree_headcount: int = 0
+    headcount_limit: Optional[int] = None
+
+
+class DepartmentNode(BaseModel):
+    """Projection for hierarchy walks (breadcrumbs, subtree listings)"""
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    code: str
+    company_id: PydanticObjectId
+    materialized_path: Optional[str] = None
+    depth: int = 0
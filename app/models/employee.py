@@ -1,7 +1,7 @@
-from beanie import Document
-from pydantic import Field, validator
+from beanie import Document, before_event, after_event, Insert, Replace, Save, SaveChanges, Update, Delete
+from pydantic import Field, PrivateAttr, validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, ClassVar
 from beanie import PydanticObjectId
 from enum import Enum
 from pydantic import BaseModel, EmailStr
@@ -9,6 +9,7 @@ from pydantic import BaseModel, EmailStr
 from pydantic import field_validator
 import re
 
+from app.models.tenant_routing import TenantRoutedMixin
 
 
 class EmploymentStatus(str, Enum):
@@ -47,7 +48,7 @@ class ReportingLine(BaseModel):
     effective_to: Optional[datetime] = None
     # Reporting line validity period
 
-class Employee(Document):
+class Employee(TenantRoutedMixin, Document):
     """
     Employee master data.
     Contains all business and HR information about an employee.
@@ -360,6 +361,57 @@ class Employee(Document):
             return f"{values['first_name']} {values['last_name']}"
         return v
     
+    # ==================== CACHE SYNC ====================
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_principal_cache(self):
+        """Identity carries department/branch paths; reload it on change"""
+        from app.services.principal_cache import principal_cache
+        principal_cache.invalidate_employee(self.id, self.user_id)
+    
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    async def revoke_scoped_tokens(self):
+        """Scoped tokens embed the same identity fields"""
+        from app.services.access_tokens import token_revocations
+        if self.user_id:
+            await token_revocations.revoke([self.user_id])
+    
+    @after_event(Insert, Replace, Save, SaveChanges, Update)
+    def sync_org_graph(self):
+        """Patch the in-process reporting graph (soft-deletes deactivate)"""
+        from app.services.org_graph import org_graph_cache
+        org_graph_cache.apply(self)
+    
+    @after_event(Delete)
+    def evict_from_org_graph(self):
+        from app.services.org_graph import org_graph_cache
+        org_graph_cache.evict(self.id)
+    
+    # ==================== HEADCOUNT / OCCUPANCY ROLLUPS ====================
+    # Stored placement read just before a write (rollups move counts from it)
+    _prior_placement: Optional[dict] = PrivateAttr(default=None)
+    
+    @before_event(Replace, Save, SaveChanges, Update, Delete)
+    async def capture_prior_placement(self):
+        from app.services.rollups import rollups
+        self._prior_placement = await rollups.placement_of(self.id)
+    
+    @after_event(Insert, Replace, Save, SaveChanges, Update)
+    async def update_headcount_rollups(self):
+        """Hire, transfer or termination: $inc department and branch counts"""
+        from app.services.rollups import placement, rollups
+        # save() also fires Update; the second call finds nothing to move
+        prior, self._prior_placement = self._prior_placement, placement(self)
+        await rollups.record(prior, self._prior_placement)
+    
+    @after_event(Delete)
+    async def release_headcount_rollups(self):
+        from app.services.rollups import rollups
+        prior, self._prior_placement = self._prior_placement, None
+        await rollups.record(prior, None)
+    
+    # Reads may be served by a secondary when the request tolerates staleness
+    stale_reads_ok: ClassVar[bool] = True
+    
     class Settings:
         name = "employees"
         
@@ -379,5 +431,24 @@ class Employee(Document):
             "last_name",  # Name search
             # For reporting queries:
             [("department_path", 1), ("employment_status", 1)],
+            [("department_path", 1), ("_id", 1)],  # Scoped listings, keyset order
             [("branch_path", 1), ("employment_status", 1)],
-        ]
\ No newline at end of file
+            # Direct reports ($elemMatch on manager + primary flag):
+            [("reporting_lines.manager_id", 1), ("reporting_lines.is_primary", 1)],
+        ]
+
+
+class EmployeeSummary(BaseModel):
+    """
+    Projection used by employee listings.
+    Fetches only the fields the list endpoints return.
+    """
+    id: PydanticObjectId = Field(alias="_id")
+    employee_code: str
+    display_name: str
+    work_email: str
+    company_id: Optional[PydanticObjectId] = None
+    department_id: Optional[PydanticObjectId] = None
+    department_path: Optional[str] = None
+    employment_status: EmploymentStatus = EmploymentStatus.ACTIVE
+    joining_date: Optional[datetime] = None
@@ -0,0 +1,38 @@
+from beanie import Document
+from pydantic import Field
+from beanie import PydanticObjectId
+from pymongo import ASCENDING, IndexModel
+
+from app.models.tenant_routing import TenantRoutedMixin
+
+class HierarchyClosure(TenantRoutedMixin, Document):
+    """
+    Closure-table row: ancestor_id is `distance` levels above descendant_id.
+    Every node has a distance-0 row to itself, so "ancestors of X",
+    "descendants of X within N levels" and "is A above B" are each one
+    indexed query. Optional index alongside materialized paths
+    (HIERARCHY_CLOSURE_ENABLED).
+    """
+    
+    hierarchy: str = Field(...)
+    # Collection the nodes belong to: "companies", "departments", "branches"
+    
+    ancestor_id: PydanticObjectId = Field(...)
+    descendant_id: PydanticObjectId = Field(...)
+    
+    distance: int = Field(..., ge=0)
+    # 0 = self, 1 = parent/child, ...
+    
+    class Settings:
+        name = "hierarchy_closure"
+        
+        indexes = [
+            IndexModel(
+                [("hierarchy", ASCENDING), ("descendant_id", ASCENDING), ("ancestor_id", ASCENDING)],
+                unique=True  # One row per pair
+            ),
+            # Ancestor chains / covering checks: descendant first, nearest first
+            [("hierarchy", 1), ("descendant_id", 1), ("distance", 1)],
+            # Subtrees, optionally depth-bounded
+            [("hierarchy", 1), ("ancestor_id", 1), ("distance", 1)],
+        ]
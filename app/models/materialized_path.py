@@ -0,0 +1,140 @@
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+from beanie import Delete, Insert, after_event, before_event
+
+# Paths look like "001.002.003": fixed-width numeric segments joined by "."
+PATH_SEPARATOR = "."
+SEGMENT_WIDTH = 3
+MAX_SEGMENT = 10 ** SEGMENT_WIDTH - 1  # 999 children per parent
+
+# First character that sorts after the separator ("/"). Every descendant of
+# "001.002" sorts in ["001.002", "001.002/"), while a sibling sharing the
+# prefix ("001.0021", "001.1" vs "001.10") sorts after the upper bound.
+_RANGE_END = chr(ord(PATH_SEPARATOR) + 1)
+
+
+def path_segments(path: Optional[str]) -> List[str]:
+    """Split "001.002.003" into ["001", "002", "003"] (None/"" -> [])"""
+    if not path:
+        return []
+    return path.split(PATH_SEPARATOR)
+
+
+def parent_path(path: Optional[str]) -> Optional[str]:
+    """Path of the immediate parent, None for top-level nodes"""
+    segments = path_segments(path)
+    if len(segments) <= 1:
+        return None
+    return PATH_SEPARATOR.join(segments[:-1])
+
+
+def ancestor_paths(path: Optional[str], include_self: bool = False) -> List[str]:
+    """All ancestor paths, root first: "001.002.003" -> ["001", "001.002"]"""
+    segments = path_segments(path)
+    end = len(segments) if include_self else len(segments) - 1
+    return [PATH_SEPARATOR.join(segments[:i]) for i in range(1, end + 1)]
+
+
+def child_path(parent: Optional[str], position: int) -> str:
+    """Path of the position-th child (1-based) under parent (None = top level)"""
+    segment = str(position).zfill(SEGMENT_WIDTH)
+    return f"{parent}{PATH_SEPARATOR}{segment}" if parent else segment
+
+
+def is_within(path: Optional[str], scope: str) -> bool:
+    """True if path equals scope or lies below it (segment-aware prefix test)"""
+    if not path:
+        return False
+    return path == scope or path.startswith(scope + PATH_SEPARATOR)
+
+
+def path_range(path: str, include_self: bool = True) -> Dict[str, str]:
+    """
+    Bounded range covering a subtree.
+    Usable directly as a field condition so Mongo does a tight index scan.
+    """
+    lower = path if include_self else path + PATH_SEPARATOR
+    return {"$gte": lower, "$lt": path + _RANGE_END}
+
+
+def subtree_filter(
+    path: Optional[str],
+    field: str = "materialized_path",
+    include_self: bool = True
+) -> Dict[str, Any]:
+    """
+    Mongo filter for every node at or below path.
+    An empty path means the whole tree (no condition).
+    """
+    if not path:
+        return {}
+    return {field: path_range(path, include_self=include_self)}
+
+
+def rebase_path(field: str, old_path: str, new_path: str) -> Dict[str, Any]:
+    """
+    Aggregation expression moving field from under old_path to under
+    new_path ("001.002.005" with 001.002 -> 003 gives "003.005"), for
+    pipeline-style updateMany over a subtree range.
+    """
+    return {"$concat": [
+        new_path,
+        {"$substrCP": ["$" + field, len(old_path), {"$strLenCP": "$" + field}]}
+    ]}
+
+
+def scope_filter(
+    scopes: List[Tuple[str, Optional[int]]],
+    field: str = "materialized_path"
+) -> Dict[str, Any]:
+    """
+    Single Mongo filter for a set of (path, depth_limit) scopes: an $or of
+    bounded path ranges. Depth limits add an anchored segment-count regex,
+    which Mongo applies to entries already inside the index range.
+    Pass scopes that are already collapsed (see ScopeIndex.scopes).
+    """
+    clauses = []
+    for path, depth_limit in scopes:
+        condition: Dict[str, Any] = path_range(path)
+        if depth_limit is not None:
+            max_segments = len(path_segments(path)) + depth_limit
+            condition["$regex"] = r"^[^.]+(?:\.[^.]+){0,%d}$" % (max_segments - 1)
+        clauses.append({field: condition})
+
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$or": clauses}
+
+
+class MaterializedPathMixin:
+    """
+    Path-query helpers and path/closure maintenance hooks shared by
+    hierarchy documents (Company, Department, Branch). Beanie collects
+    event actions from every attribute of the document class, so the
+    hooks defined here run for each of them.
+    """
+
+    # Field holding the parent node's id (set by each hierarchy model)
+    parent_field: ClassVar[str]
+
+    @classmethod
+    def subtree_query(cls, path: Optional[str], include_self: bool = True) -> Dict[str, Any]:
+        """Filter for this node's subtree on the materialized_path index"""
+        return subtree_filter(path, "materialized_path", include_self=include_self)
+
+    @before_event(Insert)
+    async def assign_materialized_path(self):
+        """Allocate the next free path under the parent (atomic per-parent counter)"""
+        from app.services.path_allocator import assign_path
+        await assign_path(self)
+
+    @after_event(Insert)
+    async def add_to_closure(self):
+        """Link the new node to its ancestors in the closure table"""
+        from app.services import closure
+        await closure.add_node(self)
+
+    @after_event(Delete)
+    async def remove_from_closure(self):
+        from app.services import closure
+        await closure.remove_node(self)
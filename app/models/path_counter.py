@@ -0,0 +1,39 @@
+from beanie import Document
+from pydantic import Field
+from datetime import datetime
+from typing import Optional
+from beanie import PydanticObjectId
+from pymongo import ASCENDING, IndexModel
+
+from app.models.tenant_routing import TenantRoutedMixin
+
+class PathCounter(TenantRoutedMixin, Document):
+    """
+    Last path segment handed out under one parent.
+    One row per (hierarchy collection, company, parent); incremented atomically
+    with findOneAndUpdate($inc) so concurrent inserts never collide.
+    """
+    
+    hierarchy: str = Field(...)
+    # Collection the paths belong to: "companies", "departments", "branches"
+    
+    company_id: Optional[PydanticObjectId] = None
+    # Owning company for departments/branches (their paths restart per company)
+    
+    parent_id: Optional[PydanticObjectId] = None
+    # Parent node; None = top level of the hierarchy
+    
+    last_segment: int = Field(default=0)
+    # Highest segment allocated so far (never reused, even after deletes)
+    
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "path_counters"
+        
+        indexes = [
+            IndexModel(
+                [("hierarchy", ASCENDING), ("company_id", ASCENDING), ("parent_id", ASCENDING)],
+                unique=True  # One counter per parent
+            ),
+        ]
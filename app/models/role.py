@@ -1,4 +1,4 @@
-from beanie import Document
+from beanie import Document, after_event, Insert, Replace, Save, SaveChanges, Update, Delete
 from pydantic import Field, validator
 from datetime import datetime
 from typing import Optional, List
@@ -7,7 +7,9 @@ from beanie import PydanticObjectId
 from pydantic import field_validator
 import re
 
-class Role(Document):
+from app.models.tenant_routing import TenantRoutedMixin
+
+class Role(TenantRoutedMixin, Document):
     """
     Role defines a set of permissions.
     Roles are reusable templates assigned to users via UserAccess.
@@ -121,6 +123,25 @@ class Role(Document):
         """Uppercase and trim name"""
         return v.upper().strip()
     
+    # ==================== CACHE SYNC ====================
+    @after_event(Insert, Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_permission_cache(self):
+        """Role templates feed every holder's permissions; drop the tenant's cache"""
+        from app.services.permissions import permission_cache
+        permission_cache.invalidate_tenant()
+    
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    async def revoke_scoped_tokens(self):
+        """Holders' scope digests embed this role's permissions"""
+        from app.models.user_access import UserAccess
+        from app.services.access_tokens import token_revocations
+        if not token_revocations.enabled:
+            return
+        holders = await UserAccess.get_motor_collection().distinct(
+            "user_id", {"role_id": self.id}
+        )
+        await token_revocations.revoke(holders)
+    
     class Settings:
         name = "roles"
         
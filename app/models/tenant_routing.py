@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import ClassVar, Dict, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.read_preferences import SecondaryPreferred
+
+# Smallest maxStalenessSeconds MongoDB accepts (heartbeat + idle write period)
+MIN_MAX_STALENESS_SECONDS = 90
+
+# Tenant database bound to the current request (set by TenantMiddleware)
+current_database: ContextVar[Optional[AsyncIOMotorDatabase]] = ContextVar(
+    "current_database", default=None
+)
+
+# Staleness the current request tolerates for reads (None = primary reads)
+read_staleness: ContextVar[Optional[int]] = ContextVar("read_staleness", default=None)
+
+# (database name, collection name, staleness) -> collection; Motor handles are
+# cheap but not free to build, and this lookup runs on every query.
+_collections: Dict[Tuple[str, str, Optional[int]], AsyncIOMotorCollection] = {}
+
+
+def bind_database(database: AsyncIOMotorDatabase) -> Token:
+    """Route tenant documents to database until reset_database(token)"""
+    return current_database.set(database)
+
+
+def reset_database(token: Token):
+    current_database.reset(token)
+
+
+def allow_stale_reads(seconds: Optional[int]):
+    """Let reads in this request go to secondaries lagging at most `seconds`"""
+    if seconds:
+        seconds = max(seconds, MIN_MAX_STALENESS_SECONDS)
+    read_staleness.set(seconds or None)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Read from the primary inside the block whatever the request tolerates;
+    for loads whose result outlives the request (caches) and for reads
+    feeding writes.
+    """
+    token = read_staleness.set(None)
+    try:
+        yield
+    finally:
+        read_staleness.reset(token)
+
+
+class TenantRoutedMixin:
+    """
+    Resolves the collection from the request's tenant database instead of
+    the one init_beanie bound at startup. Beanie fetches the collection
+    through get_motor_collection() for every operation, so one init_beanie
+    serves every tenant and all of them share the client's pool.
+
+    Models that set stale_reads_ok = True also honour the request's
+    staleness tolerance (secondaryPreferred + maxStalenessSeconds); the
+    rest (users, grants) always read from the primary.
+    """
+
+    stale_reads_ok: ClassVar[bool] = False
+
+    @classmethod
+    def get_motor_collection(cls) -> AsyncIOMotorCollection:
+        database = current_database.get()
+        staleness = read_staleness.get() if cls.stale_reads_ok else None
+        if database is None and staleness is None:
+            return super().get_motor_collection()
+
+        if database is None:
+            database = super().get_motor_collection().database
+        key = (database.name, cls.get_collection_name(), staleness)
+        collection = _collections.get(key)
+        if collection is None:
+            collection = database[key[1]]
+            if staleness is not None:
+                collection = collection.with_options(
+                    read_preference=SecondaryPreferred(max_staleness=staleness)
+                )
+            _collections[key] = collection
+        return collection
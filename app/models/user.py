@@ -1,4 +1,4 @@
-from beanie import Document
+from beanie import Document, after_event, Insert, Replace, Save, SaveChanges, Update, Delete
 from pydantic import Field, EmailStr, validator
 from datetime import datetime
 from typing import Optional
@@ -6,7 +6,9 @@ from beanie import PydanticObjectId
 # from bson import ObjectId # Not needed with Beanie's PydanticObjectId in Pydantic v2
 from pydantic import field_validator
 
-class User(Document):
+from app.models.tenant_routing import TenantRoutedMixin
+
+class User(TenantRoutedMixin, Document):
     """
     User account for authentication and authorization.
     Represents the login identity.
@@ -84,6 +86,10 @@ class User(Document):
     # Example: [{"token": "abc...", "device": "Chrome", "expires": "..."}]
     # Allows: Force logout from all devices
     
+    token_epoch: int = Field(default=0)
+    # Revocation epoch (epoch milliseconds of the last bump)
+    # Scoped access tokens issued before it no longer carry valid claims
+    
     # ==================== PASSWORD RESET ====================
     reset_token: Optional[str] = None
     # One-time token for password reset
@@ -129,6 +135,19 @@ class User(Document):
             return v.lower().strip()
         return v
     
+    # ==================== CACHE SYNC ====================
+    @after_event(Insert, Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_principal_cache(self):
+        """Reload this user's authenticated principal on next request"""
+        from app.services.principal_cache import principal_cache
+        principal_cache.invalidate(self.id)
+    
+    @after_event(Replace, Save, SaveChanges, Update, Delete)
+    async def revoke_scoped_tokens(self):
+        """Scoped tokens embed identity fields; stale them on change"""
+        from app.services.access_tokens import token_revocations
+        await token_revocations.revoke([self.id])
+    
     class Settings:
         name = "users"
         
@@ -138,4 +157,5 @@ class User(Document):
             "employee_id",  # Quick employee lookup
             "is_active",  # Filter active users
             [("is_deleted", 1), ("is_active", 1)],  # Compound
+            "token_epoch",  # Revocation poller
         ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from beanie import Document
+from beanie import Document, before_event, after_event, Insert, Replace, Save, SaveChanges, Update, Delete
 from pydantic import Field, validator
 from datetime import datetime
 from typing import Optional, List
@@ -7,7 +7,12 @@ from beanie import PydanticObjectId
 from pydantic import field_validator
 import re
 
-class UserAccess(Document):
+from app.models.tenant_routing import TenantRoutedMixin
+
+# Scope types whose paths are only unique within a company
+COMPANY_QUALIFIED_SCOPES = ("DEPARTMENT", "BRANCH")
+
+class UserAccess(TenantRoutedMixin, Document):
     """
     Links a User to a Role within a specific Scope.
     One user can have multiple UserAccess records (different roles in different places).
@@ -40,6 +45,11 @@ class UserAccess(Document):
     # All descendants of this path are included
     # Required
     
+    company_id: Optional[PydanticObjectId] = None
+    # Company whose department/branch paths path_limit refers to
+    # (those paths restart at "001" in every company)
+    # Defaults to the holder's employer on insert; unused for COMPANY/GLOBAL
+    
     # ==================== SCOPE DEPTH LIMIT ====================
     depth_limit: Optional[int] = None
     # Optional: Limit how deep the scope goes
@@ -145,6 +155,27 @@ class UserAccess(Document):
             raise ValueError('Invalid path_limit format. Expected: 001.002.003')
         return v
     
+    # ==================== COMPANY QUALIFIER ====================
+    @before_event(Insert, Replace, Save)
+    async def default_company(self):
+        """Pin department/branch grants to the holder's employer when not given"""
+        if self.company_id is None and self.scope_type in COMPANY_QUALIFIED_SCOPES:
+            from app.services.permissions import holder_company
+            self.company_id = await holder_company(self.user_id)
+    
+    # ==================== CACHE SYNC ====================
+    @after_event(Insert, Replace, Save, SaveChanges, Update, Delete)
+    def invalidate_permission_cache(self):
+        """Recompile this user's effective permissions on next use"""
+        from app.services.permissions import permission_cache
+        permission_cache.invalidate(self.user_id)
+    
+    @after_event(Insert, Replace, Save, SaveChanges, Update, Delete)
+    async def revoke_scoped_tokens(self):
+        """Tokens carrying this user's old scope digest must stop authorizing"""
+        from app.services.access_tokens import token_revocations
+        await token_revocations.revoke([self.user_id])
+    
     class Settings:
         name = "user_access"
         
@@ -154,6 +185,7 @@ class UserAccess(Document):
             "scope_type",
             "path_limit",
             [("user_id", 1), ("is_active", 1)],  # Active access for user
+            [("company_id", 1), ("scope_type", 1)],  # Grants on a company's departments/branches
             [("user_id", 1), ("scope_type", 1), ("path_limit", 1)],  # Unique combo
             [("valid_from", 1), ("valid_until", 1)],  # Time-based queries
             [("is_active", 1), ("valid_until", 1)],  # Find expiring access
@@ -0,0 +1,236 @@
+import asyncio
+import time
+from datetime import timezone
+from typing import Any, Dict, Iterable, Optional, Set
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+
+from app.models.user import User
+from app.services.permissions import EffectivePermissions, ScopedGrant
+from app.services.principal_cache import EMPLOYEE_FIELDS, EmployeeIdentity, Principal
+from config.settings import settings
+
+# Bump when the digest layout changes; tokens with another version fall back
+# to the database path until they are reissued.
+SCOPE_DIGEST_VERSION = 2
+
+_ID_FIELDS = ("_id", "department_id", "branch_id")
+
+
+def epoch_now() -> int:
+    """Revocation epochs are wall-clock milliseconds (monotonic under $max)"""
+    return int(time.time() * 1000)
+
+
+def _to_oid(value: Optional[str]) -> Optional[PydanticObjectId]:
+    return PydanticObjectId(value) if value else None
+
+
+def encode_scope_digest(compiled: EffectivePermissions) -> Dict[str, Any]:
+    """
+    Compact form of compiled grants:
+    {"v": version, "g": [[role, scope_type, path, depth, [perms], company]], "x": expiry}
+    Only granted permissions are kept; "x" is the next validity boundary.
+    """
+    return {
+        "v": SCOPE_DIGEST_VERSION,
+        "g": [
+            [grant.role_name, grant.scope_type, grant.path_limit, grant.depth_limit,
+             sorted(perm for perm, value in grant.permissions.items() if value),
+             str(grant.company_id) if grant.company_id else None]
+            for grant in compiled.grants
+        ],
+        # next_change is naive UTC; timestamp() alone would read it as local time
+        "x": int(compiled.next_change.replace(tzinfo=timezone.utc).timestamp()) if compiled.next_change else None
+    }
+
+
+def decode_scope_digest(user_id: PydanticObjectId, digest: Dict[str, Any]) -> Optional[EffectivePermissions]:
+    """EffectivePermissions from a digest, or None if it is unusable"""
+    if not isinstance(digest, dict) or digest.get("v") != SCOPE_DIGEST_VERSION:
+        return None
+    if digest.get("x") is not None and time.time() >= digest["x"]:
+        return None  # a grant started or expired since issue
+    try:
+        grants = [
+            ScopedGrant.restore(role, scope_type, path, depth, perms, _to_oid(company))
+            for role, scope_type, path, depth, perms, company in digest["g"]
+        ]
+    except (KeyError, TypeError, ValueError, InvalidId):
+        return None
+    # Lives as long as the token; staleness is handled by the revocation epoch
+    return EffectivePermissions(user_id, grants, expires_at=float("inf"))
+
+
+def scoped_token_claims(principal: Principal, compiled: EffectivePermissions, epoch: int) -> Dict[str, Any]:
+    """Claims for a self-contained token (identity + scope digest + epoch)"""
+    employee = None
+    if principal.employee is not None:
+        employee = {"_id": str(principal.employee.id)}
+        for field in EMPLOYEE_FIELDS:
+            value = getattr(principal.employee, field)
+            employee[field] = str(value) if field in _ID_FIELDS and value else value
+
+    return {
+        "sub": str(principal.id),
+        "tnt": token_revocations.tenant_key(),
+        "epc": epoch,
+        "usr": {
+            "email": principal.email,
+            "full_name": principal.full_name,
+            "emp": employee
+        },
+        "scp": encode_scope_digest(compiled)
+    }
+
+
+def principal_from_claims(payload: Dict[str, Any]) -> Optional[Principal]:
+    """
+    Principal with compiled permissions attached, built without database
+    I/O; None when the claims are stale, from another tenant or malformed
+    (the caller then loads the user from the database as for plain tokens).
+    """
+    try:
+        user_id = PydanticObjectId(payload["sub"])
+        identity = payload["usr"]
+        tenant = payload["tnt"]
+        epoch = int(payload["epc"])
+    except (KeyError, TypeError, ValueError, InvalidId):
+        return None
+
+    if tenant != token_revocations.tenant_key():
+        return None
+    if token_revocations.is_stale(tenant, user_id, epoch):
+        return None
+
+    compiled = decode_scope_digest(user_id, payload.get("scp"))
+    if compiled is None:
+        return None
+
+    employee = None
+    try:
+        if identity.get("emp"):
+            employee_doc = dict(identity["emp"])
+            for field in _ID_FIELDS:
+                employee_doc[field] = _to_oid(employee_doc.get(field))
+            employee = EmployeeIdentity(employee_doc)
+    except (KeyError, TypeError, InvalidId):
+        return None
+
+    principal = Principal({
+        "_id": user_id,
+        "email": identity.get("email"),
+        "full_name": identity.get("full_name"),
+        "employee_id": employee.id if employee else None
+    }, employee)
+    principal.permissions = compiled
+    return principal
+
+
+class TokenRevocations:
+    """
+    Latest revocation epoch per (tenant, user), held in memory.
+    Local revocations apply immediately; a poller picks up bumps made by
+    other processes every TOKEN_REVOCATION_POLL_SECONDS. Tenants are primed
+    on first sight; until then their scoped tokens are treated as stale.
+    """
+
+    def __init__(self, poll_seconds: int, window_seconds: int):
+        self.poll_seconds = poll_seconds
+        # Bumps older than the token lifetime cannot stale a live token
+        self.window_ms = window_seconds * 1000
+        self._epochs: Dict[tuple, int] = {}
+        self._checkpoints: Dict[str, int] = {}
+        self._pending: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def tenant_key() -> str:
+        """Name of the database User is currently bound to"""
+        return User.get_motor_collection().database.name
+
+    @property
+    def enabled(self) -> bool:
+        """Revocations only matter while scoped tokens are being issued"""
+        return settings.SCOPED_TOKENS_ENABLED
+
+    def note(self, tenant: str, user_id: PydanticObjectId, epoch: int):
+        key = (tenant, str(user_id))
+        self._epochs[key] = max(self._epochs.get(key, 0), epoch)
+
+    def is_stale(self, tenant: str, user_id: PydanticObjectId, epoch: int) -> bool:
+        if tenant not in self._checkpoints:
+            self._pending.add(tenant)
+            return True
+        return epoch < self._epochs.get((tenant, str(user_id)), 0)
+
+    async def revoke(self, user_ids: Iterable[PydanticObjectId]):
+        """Bump the epoch so previously issued scoped tokens stop authorizing"""
+        if not self.enabled:
+            return
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        tenant = self.tenant_key()
+        epoch = epoch_now()
+        await User.get_motor_collection().update_many(
+            {"_id": {"$in": user_ids}},
+            {"$max": {"token_epoch": epoch}}
+        )
+        for user_id in user_ids:
+            self.note(tenant, user_id, epoch)
+
+    async def poll(self, tenant: str):
+        """Load epochs bumped since the last poll of tenant"""
+        now = epoch_now()
+        since = self._checkpoints.get(tenant)
+        # First poll covers the token lifetime; later ones overlap a little
+        # to tolerate clock skew between processes.
+        since = now - self.window_ms if since is None else since - 2 * self.poll_seconds * 1000
+
+        collection = User.get_motor_collection()
+        cursor = collection.database.client[tenant][collection.name].find(
+            {"token_epoch": {"$gte": since}},
+            {"token_epoch": 1}
+        )
+        async for doc in cursor:
+            self.note(tenant, doc["_id"], doc["token_epoch"])
+
+        self._checkpoints[tenant] = now
+        self._prune(now)
+
+    def _prune(self, now: int):
+        horizon = now - self.window_ms
+        for key in [key for key, epoch in self._epochs.items() if epoch < horizon]:
+            del self._epochs[key]
+
+    async def run(self):
+        while True:
+            for tenant in list(self._checkpoints.keys() | self._pending):
+                try:
+                    await self.poll(tenant)
+                    self._pending.discard(tenant)
+                except Exception as exc:
+                    print(f"⚠️ Token revocation poll failed for {tenant}: {exc}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self, tenants: Iterable[str] = ()):
+        self._pending.update(tenants)
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+token_revocations = TokenRevocations(
+    poll_seconds=settings.TOKEN_REVOCATION_POLL_SECONDS,
+    window_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Type
+
+from beanie import Document, PydanticObjectId
+
+from app.models.hierarchy_closure import HierarchyClosure
+from config.settings import settings
+
+
+def _hierarchy(model: Type[Document]) -> str:
+    return model.get_collection_name()
+
+
+# ==================== MAINTENANCE ====================
+# No-ops unless HIERARCHY_CLOSURE_ENABLED; run scripts/rebuild_closure.py
+# (rebuild() for each hierarchy) before turning it on.
+
+async def add_node(node: Document, session=None):
+    """Rows for a newly inserted node: itself plus each of its parent's ancestors"""
+    if not settings.HIERARCHY_CLOSURE_ENABLED:
+        return
+    hierarchy = _hierarchy(type(node))
+    closure = HierarchyClosure.get_motor_collection()
+    rows = [{"hierarchy": hierarchy, "ancestor_id": node.id, "descendant_id": node.id, "distance": 0}]
+
+    parent_id = getattr(node, node.parent_field)
+    if parent_id is not None:
+        async for row in closure.find(
+            {"hierarchy": hierarchy, "descendant_id": parent_id},
+            {"ancestor_id": 1, "distance": 1},
+            session=session
+        ):
+            rows.append({
+                "hierarchy": hierarchy,
+                "ancestor_id": row["ancestor_id"],
+                "descendant_id": node.id,
+                "distance": row["distance"] + 1
+            })
+
+    await closure.insert_many(rows, ordered=False, session=session)
+
+
+async def remove_node(node: Document, session=None):
+    """Drop every row mentioning a hard-deleted node"""
+    if not settings.HIERARCHY_CLOSURE_ENABLED:
+        return
+    await HierarchyClosure.get_motor_collection().delete_many({
+        "hierarchy": _hierarchy(type(node)),
+        "$or": [{"ancestor_id": node.id}, {"descendant_id": node.id}]
+    }, session=session)
+
+
+async def move_node(
+    model: Type[Document],
+    node_id: PydanticObjectId,
+    new_parent_id: Optional[PydanticObjectId],
+    session=None
+) -> int:
+    """
+    Re-link a subtree under a new parent: unlink it from its old ancestors,
+    then link every subtree row to every ancestor of the new parent.
+    Rows inside the subtree are unchanged. Returns rows inserted.
+    """
+    if not settings.HIERARCHY_CLOSURE_ENABLED:
+        return 0
+    hierarchy = _hierarchy(model)
+    closure = HierarchyClosure.get_motor_collection()
+
+    subtree = [row async for row in closure.find(
+        {"hierarchy": hierarchy, "ancestor_id": node_id},
+        {"descendant_id": 1, "distance": 1},
+        session=session
+    )]
+    subtree_ids = [row["descendant_id"] for row in subtree]
+
+    await closure.delete_many({
+        "hierarchy": hierarchy,
+        "descendant_id": {"$in": subtree_ids},
+        "ancestor_id": {"$nin": subtree_ids}
+    }, session=session)
+
+    if new_parent_id is None:
+        return 0
+
+    ancestors = [row async for row in closure.find(
+        {"hierarchy": hierarchy, "descendant_id": new_parent_id},
+        {"ancestor_id": 1, "distance": 1},
+        session=session
+    )]
+    rows = [{
+        "hierarchy": hierarchy,
+        "ancestor_id": above["ancestor_id"],
+        "descendant_id": below["descendant_id"],
+        "distance": above["distance"] + 1 + below["distance"]
+    } for above in ancestors for below in subtree]
+    if rows:
+        await closure.insert_many(rows, ordered=False, session=session)
+    return len(rows)
+
+
+async def rebuild(model: Type[Document]) -> int:
+    """Recompute a hierarchy's closure from parent links (backfill / repair)"""
+    hierarchy = _hierarchy(model)
+    parents: Dict[PydanticObjectId, Optional[PydanticObjectId]] = {
+        doc["_id"]: doc.get(model.parent_field)
+        async for doc in model.get_motor_collection().find({}, {model.parent_field: 1})
+    }
+
+    rows = []
+    for node_id in parents:
+        ancestor, distance, seen = node_id, 0, set()
+        while ancestor is not None and ancestor in parents and ancestor not in seen:
+            seen.add(ancestor)
+            rows.append({"hierarchy": hierarchy, "ancestor_id": ancestor,
+                         "descendant_id": node_id, "distance": distance})
+            ancestor, distance = parents[ancestor], distance + 1
+
+    closure = HierarchyClosure.get_motor_collection()
+    await closure.delete_many({"hierarchy": hierarchy})
+    if rows:
+        await closure.insert_many(rows, ordered=False)
+    return len(rows)
+
+
+# ==================== QUERIES ====================
+
+async def ancestor_ids(
+    model: Type[Document],
+    node_id: PydanticObjectId,
+    max_distance: Optional[int] = None,
+    include_self: bool = False
+) -> List[PydanticObjectId]:
+    """Ancestors nearest first (parent, grandparent, ...)"""
+    distance = {"$gte": 0 if include_self else 1}
+    if max_distance is not None:
+        distance["$lte"] = max_distance
+    cursor = HierarchyClosure.get_motor_collection().find(
+        {"hierarchy": _hierarchy(model), "descendant_id": node_id, "distance": distance},
+        {"ancestor_id": 1}
+    ).sort("distance", 1)
+    return [row["ancestor_id"] async for row in cursor]
+
+
+async def descendant_ids(
+    model: Type[Document],
+    node_id: PydanticObjectId,
+    max_distance: Optional[int] = None,
+    include_self: bool = False
+) -> List[PydanticObjectId]:
+    """Descendants breadth-first, optionally at most max_distance levels down"""
+    distance = {"$gte": 0 if include_self else 1}
+    if max_distance is not None:
+        distance["$lte"] = max_distance
+    cursor = HierarchyClosure.get_motor_collection().find(
+        {"hierarchy": _hierarchy(model), "ancestor_id": node_id, "distance": distance},
+        {"descendant_id": 1}
+    ).sort("distance", 1)
+    return [row["descendant_id"] async for row in cursor]
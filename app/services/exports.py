@@ -0,0 +1,52 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Sequence
+
+
+async def iter_batches(rows: AsyncIterable[Any], size: int) -> AsyncIterator[List[Any]]:
+    """Group an async row stream into lists of at most `size` rows"""
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_ndjson(batches: AsyncIterable[List[Dict[str, Any]]]) -> AsyncIterator[str]:
+    """One JSON object per line, one chunk per batch"""
+    async for batch in batches:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+
+async def iter_csv(
+    batches: AsyncIterable[List[Dict[str, Any]]],
+    fields: Sequence[str]
+) -> AsyncIterator[str]:
+    """Header line, then one CSV chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fields), extrasaction="ignore")
+
+    def drain() -> str:
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    writer.writeheader()
+    yield drain()
+    async for batch in batches:
+        writer.writerows(batch)
+        yield drain()
+
+
+async def map_batches(
+    batches: AsyncIterable[List[Any]],
+    transform: Callable[[List[Any]], Any]
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Apply an async per-batch transform (e.g. name resolution + formatting)"""
+    async for batch in batches:
+        yield await transform(batch)
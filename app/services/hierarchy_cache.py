@@ -0,0 +1,239 @@
+import asyncio
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.models.company import Company
+from app.models.tenant_routing import primary_reads
+from config.settings import settings
+
+
+class CompanyNode(BaseModel):
+    """
+    Compact company record held by the hierarchy cache.
+    Field names mirror Company so the tree builder accepts either.
+    """
+
+    model_config = ConfigDict(populate_by_name=True, frozen=True)
+
+    id: PydanticObjectId = Field(alias="_id")
+    parent_company_id: Optional[PydanticObjectId] = None
+    materialized_path: Optional[str] = None
+    depth: int = 0
+    name: str
+    code: str
+    type: str
+    status: str = "active"
+    currency: str = "INR"
+
+    @classmethod
+    def from_company(cls, company: Company) -> "CompanyNode":
+        return cls(
+            id=company.id,
+            parent_company_id=company.parent_company_id,
+            materialized_path=company.materialized_path,
+            depth=company.depth,
+            name=company.name,
+            code=company.code,
+            type=company.type,
+            status=company.status,
+            currency=company.currency,
+        )
+
+    @property
+    def sort_key(self) -> Tuple[int, str, str]:
+        # Same order as sort("+depth", "+materialized_path"); Mongo sorts null
+        # first. The id makes the key unique so it can serve as a page cursor.
+        return (self.depth, self.materialized_path or "", str(self.id))
+
+
+def _link_nodes(items) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Build tree from flat list, returning the roots and an id -> node lookup"""
+    item_dict = {str(item.id): {
+        "id": str(item.id),
+        "name": item.name,
+        "code": item.code,
+        "type": item.type,
+        "path": item.materialized_path,
+        "depth": item.depth,
+        "currency": item.currency,
+        "status": item.status,
+        "children": []
+    } for item in items}
+
+    tree = []
+    for item in items:
+        item_data = item_dict[str(item.id)]
+        if item.parent_company_id is None:
+            # Root node
+            tree.append(item_data)
+        else:
+            # Child node - add to parent
+            parent_id = str(item.parent_company_id)
+            if parent_id in item_dict:
+                item_dict[parent_id]["children"].append(item_data)
+
+    return tree, item_dict
+
+
+def build_tree(items) -> List[Dict[str, Any]]:
+    """Build hierarchical tree from flat list (Company documents or CompanyNodes)"""
+    tree, _ = _link_nodes(items)
+    return tree
+
+
+class TenantHierarchy:
+    """
+    In-memory company hierarchy for one tenant database.
+    Holds compact nodes; the rendered tree is built lazily and reused
+    until the next patch.
+    """
+
+    def __init__(self, nodes: List[CompanyNode]):
+        self.nodes: Dict[str, CompanyNode] = {str(node.id): node for node in nodes}
+        self.loaded_at = time.monotonic()
+        self._ordered: Optional[List[CompanyNode]] = None
+        self._paths: Optional[Dict[PydanticObjectId, Optional[str]]] = None
+        self._tree: Optional[List[Dict[str, Any]]] = None
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def is_expired(self) -> bool:
+        ttl = settings.HIERARCHY_CACHE_TTL_SECONDS
+        return ttl > 0 and time.monotonic() - self.loaded_at > ttl
+
+    def ordered(self) -> List[CompanyNode]:
+        """Nodes sorted by depth, then path"""
+        if self._ordered is None:
+            self._ordered = sorted(self.nodes.values(), key=lambda node: node.sort_key)
+        return self._ordered
+
+    def page(self, after: Optional[Tuple[int, str, str]], limit: int) -> List[CompanyNode]:
+        """Up to limit nodes following the sort key `after` (keyset page)"""
+        ordered = self.ordered()
+        start = 0 if after is None else bisect_right(ordered, tuple(after), key=lambda node: node.sort_key)
+        return ordered[start:start + limit]
+
+    def get(self, company_id: str) -> Optional[CompanyNode]:
+        return self.nodes.get(company_id)
+
+    def paths(self) -> Dict[PydanticObjectId, Optional[str]]:
+        """Materialized path of every live company, by id"""
+        if self._paths is None:
+            self._paths = {node.id: node.materialized_path for node in self.nodes.values()}
+        return self._paths
+
+    def tree(self) -> List[Dict[str, Any]]:
+        """Complete hierarchy as tree"""
+        if self._tree is None:
+            self._tree, self._index = _link_nodes(self.ordered())
+        return self._tree
+
+    def subtree(self, company_id: str) -> Optional[Dict[str, Any]]:
+        """Tree rooted at company_id, or None if it is not a live company"""
+        self.tree()
+        return self._index.get(company_id)
+
+    def upsert(self, node: CompanyNode):
+        self.nodes[str(node.id)] = node
+        self._reset()
+
+    def remove(self, company_id: str):
+        if self.nodes.pop(company_id, None) is not None:
+            self._reset()
+
+    def _reset(self):
+        self._ordered = None
+        self._paths = None
+        self._tree = None
+        self._index = None
+
+
+class HierarchyCache:
+    """
+    Per-tenant company hierarchy cache.
+    Loaded on first use with a single projected query, then patched from
+    Company write events. Bulk writes (find().update(...)) do not fire
+    events and must call invalidate(); HIERARCHY_CACHE_TTL_SECONDS bounds
+    staleness across worker processes.
+    """
+
+    def __init__(self):
+        self._tenants: Dict[str, TenantHierarchy] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generations: Dict[str, int] = {}
+
+    @staticmethod
+    def tenant_key() -> str:
+        """Name of the database Company is currently bound to"""
+        return Company.get_motor_collection().database.name
+
+    async def get(self) -> TenantHierarchy:
+        key = self.tenant_key()
+        hierarchy = self._tenants.get(key)
+        if hierarchy is not None and not hierarchy.is_expired():
+            return hierarchy
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            hierarchy = self._tenants.get(key)
+            if hierarchy is None or hierarchy.is_expired():
+                # Shared with primary-only routes: load from the primary
+                with primary_reads():
+                    hierarchy = await self._load(key)
+        return hierarchy
+
+    async def _load(self, key: str) -> TenantHierarchy:
+        generation = self._generations.get(key, 0)
+        nodes = await Company.find(
+            Company.is_deleted == False
+        ).project(CompanyNode).to_list()
+
+        hierarchy = TenantHierarchy(nodes)
+        # Only publish if no write landed while we were reading
+        if self._generations.get(key, 0) == generation:
+            self._tenants[key] = hierarchy
+        return hierarchy
+
+    async def path_of(self, company_id) -> Optional[str]:
+        """Materialized path of a live company (None for the root or unknown ids)"""
+        node = (await self.get()).get(str(company_id))
+        return node.materialized_path if node else None
+
+    async def company_paths(self) -> Dict[PydanticObjectId, Optional[str]]:
+        """Live company id -> materialized path (for company-scoped filters)"""
+        return (await self.get()).paths()
+
+    def apply(self, company: Company):
+        """Patch the cached hierarchy after a Company insert/update/soft-delete"""
+        key = self.tenant_key()
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+        hierarchy = self._tenants.get(key)
+        if hierarchy is None or company.id is None:
+            return
+
+        if company.is_deleted:
+            hierarchy.remove(str(company.id))
+        else:
+            hierarchy.upsert(CompanyNode.from_company(company))
+
+    def evict(self, company_id: PydanticObjectId):
+        """Drop a hard-deleted company from the cached hierarchy"""
+        key = self.tenant_key()
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+        hierarchy = self._tenants.get(key)
+        if hierarchy is not None:
+            hierarchy.remove(str(company_id))
+
+    def invalidate(self, key: Optional[str] = None):
+        """Forget the cached hierarchy (current tenant by default)"""
+        key = key or self.tenant_key()
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._tenants.pop(key, None)
+
+
+hierarchy_cache = HierarchyCache()
@@ -0,0 +1,160 @@
+from typing import Any, Dict, Optional, Type
+
+from beanie import Document, PydanticObjectId
+from pymongo.errors import OperationFailure
+
+from app.models.branch import Branch
+from app.models.company import Company
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.materialized_path import is_within, path_range, rebase_path
+from app.models.user_access import UserAccess
+from app.services import closure
+from app.services.access_tokens import token_revocations
+from app.services.hierarchy_cache import hierarchy_cache
+from app.services.path_allocator import allocate_child_path
+from app.services.permissions import permission_cache
+from app.services.principal_cache import principal_cache
+from app.services.rollups import rollups
+
+
+class HierarchyMoveError(ValueError):
+    """The requested move would corrupt the hierarchy"""
+
+
+class TransactionsUnavailable(RuntimeError):
+    """The server cannot run multi-document transactions (standalone mongod)"""
+
+
+# Server error code for "Transaction numbers are only allowed on a replica
+# set member or mongos"
+ILLEGAL_OPERATION = 20
+
+
+class HierarchySpec:
+    """How one hierarchy collection links nodes and what refers to its paths"""
+
+    __slots__ = ("model", "grant_scope", "employee_field")
+
+    def __init__(self, model: Type[Document], grant_scope: str, employee_field: Optional[str]):
+        self.model = model
+        self.grant_scope = grant_scope        # UserAccess.scope_type using these paths
+        self.employee_field = employee_field  # Employee field copying the node path
+
+
+HIERARCHIES = {
+    Company: HierarchySpec(Company, "COMPANY", None),
+    Department: HierarchySpec(Department, "DEPARTMENT", "department_path"),
+    Branch: HierarchySpec(Branch, "BRANCH", "branch_path"),
+}
+
+
+async def move_subtree(
+    model: Type[Document],
+    node_id: PydanticObjectId,
+    new_parent_id: Optional[PydanticObjectId]
+) -> Dict[str, Any]:
+    """
+    Re-parent a node, rewriting materialized_path/depth/root_id of its whole
+    subtree plus the Employee paths and UserAccess path_limits that copy
+    them, the ancestors' subtree rollups and (when enabled) the closure
+    table, with one pipeline updateMany per collection inside a single
+    transaction. Returns the node's new placement and per-collection counts.
+    """
+    spec = HIERARCHIES[model]
+    node = await model.get(node_id)
+    if node is None or node.is_deleted:
+        raise LookupError(f"{model.__name__} not found")
+    if not node.materialized_path:
+        raise HierarchyMoveError("The root company cannot be moved")
+
+    parent = None
+    if new_parent_id is not None:
+        parent = await model.get(new_parent_id)
+        if parent is None or parent.is_deleted:
+            raise LookupError(f"Parent {model.__name__.lower()} not found")
+        if parent.id == node.id or is_within(parent.materialized_path, node.materialized_path):
+            raise HierarchyMoveError("Cannot move a node under itself or its descendants")
+        if model is not Company and parent.company_id != node.company_id:
+            raise HierarchyMoveError("Parent belongs to a different company")
+    elif model is Company:
+        raise HierarchyMoveError("A company can only be moved under another company")
+
+    if getattr(node, model.parent_field) == (parent.id if parent else None):
+        return {"id": str(node.id), "materialized_path": node.materialized_path,
+                "depth": node.depth, "nodes": 0, "employees": 0, "grants": 0}
+
+    old_path = node.materialized_path
+    new_depth = parent.depth + 1 if parent else 0
+    depth_delta = new_depth - node.depth
+    new_root = (parent.root_id or parent.id) if parent else node.id
+    # Department and branch paths are only unique within their company
+    company = {} if model is Company else {"company_id": node.company_id}
+    subtree = {**company, "materialized_path": path_range(old_path)}
+
+    collection = model.get_motor_collection()
+    client = collection.database.client
+    affected_users = set()
+    counts = {}
+
+    async def rewrite(session):
+        new_path = await allocate_child_path(model, parent, company.get("company_id"), session=session)
+
+        result = await collection.update_many(subtree, [{"$set": {
+            "materialized_path": rebase_path("materialized_path", old_path, new_path),
+            "depth": {"$add": ["$depth", depth_delta]},
+            "root_id": new_root
+        }}], session=session)
+        counts["nodes"] = result.modified_count
+
+        await collection.update_one(
+            {"_id": node.id},
+            {"$set": {model.parent_field: parent.id if parent else None}},
+            session=session
+        )
+        await closure.move_node(model, node.id, parent.id if parent else None, session=session)
+        await rollups.move_subtree(
+            model, node.id, old_path, parent.materialized_path if parent else None, session=session
+        )
+
+        counts["employees"] = 0
+        if spec.employee_field:
+            employees = Employee.get_motor_collection()
+            employee_filter = {**company, spec.employee_field: path_range(old_path)}
+            affected_users.update(
+                await employees.distinct("user_id", employee_filter, session=session)
+            )
+            result = await employees.update_many(employee_filter, [{"$set": {
+                spec.employee_field: rebase_path(spec.employee_field, old_path, new_path)
+            }}], session=session)
+            counts["employees"] = result.modified_count
+
+        grants = UserAccess.get_motor_collection()
+        grant_filter = {**company, "scope_type": spec.grant_scope, "path_limit": path_range(old_path)}
+        affected_users.update(await grants.distinct("user_id", grant_filter, session=session))
+        result = await grants.update_many(grant_filter, [{"$set": {
+            "path_limit": rebase_path("path_limit", old_path, new_path)
+        }}], session=session)
+        counts["grants"] = result.modified_count
+        return new_path
+
+    try:
+        async with await client.start_session() as session:
+            new_path = await session.with_transaction(rewrite)
+    except OperationFailure as exc:
+        if exc.code == ILLEGAL_OPERATION:
+            raise TransactionsUnavailable("Hierarchy moves need a replica set (transactions)") from exc
+        raise
+
+    await _invalidate_caches(model, {user_id for user_id in affected_users if user_id})
+
+    return {"id": str(node.id), "materialized_path": new_path, "depth": new_depth, **counts}
+
+
+async def _invalidate_caches(model: Type[Document], user_ids):
+    """Bulk updates skip document events; drop what they would have dropped"""
+    if model is Company:
+        hierarchy_cache.invalidate()
+    principal_cache.invalidate_tenant()
+    permission_cache.invalidate_tenant()
+    await token_revocations.revoke(user_ids)
@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, Optional, Type
+
+from beanie import Document, PydanticObjectId
+
+from app.models.department import Department
+
+
+class BatchLoader:
+    """
+    DataLoader-style per-request cache keyed by ObjectId.
+    Collects ids, fetches the ones not seen yet with a single $in query
+    (projected to the requested fields) and memoises the raw documents,
+    including misses. Create one per request; it never expires.
+    """
+
+    def __init__(self, model: Type[Document], fields: Iterable[str]):
+        self.model = model
+        self.projection = {field: 1 for field in fields}
+        self._cache: Dict[PydanticObjectId, Optional[dict]] = {}
+
+    async def load_many(self, ids: Iterable[Optional[PydanticObjectId]]) -> Dict[PydanticObjectId, dict]:
+        """Documents for the given ids (unknown ids are left out)"""
+        wanted = {doc_id for doc_id in ids if doc_id is not None}
+        missing = [doc_id for doc_id in wanted if doc_id not in self._cache]
+
+        if missing:
+            cursor = self.model.get_motor_collection().find(
+                {"_id": {"$in": missing}},
+                self.projection
+            )
+            async for doc in cursor:
+                self._cache[doc["_id"]] = doc
+            for doc_id in missing:
+                self._cache.setdefault(doc_id, None)
+
+        return {
+            doc_id: self._cache[doc_id]
+            for doc_id in wanted
+            if self._cache[doc_id] is not None
+        }
+
+    async def load(self, doc_id: Optional[PydanticObjectId]) -> Optional[dict]:
+        if doc_id is None:
+            return None
+        return (await self.load_many([doc_id])).get(doc_id)
+
+
+class DepartmentNameLoader(BatchLoader):
+    """Resolves department names for employee listings"""
+
+    def __init__(self):
+        super().__init__(Department, fields=["name"])
+
+    async def names(self, department_ids: Iterable[Optional[PydanticObjectId]]) -> Dict[PydanticObjectId, str]:
+        departments = await self.load_many(department_ids)
+        return {dept_id: dept["name"] for dept_id, dept in departments.items()}
+
+    async def name(self, department_id: Optional[PydanticObjectId], default: str = "N/A") -> str:
+        dept = await self.load(department_id)
+        return dept["name"] if dept else default
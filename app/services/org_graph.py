@@ -0,0 +1,385 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from beanie import PydanticObjectId
+
+from app.models.employee import Employee
+from app.models.tenant_routing import primary_reads
+from config.settings import settings
+
+# Projection the graph is built from (one pass over the collection)
+GRAPH_FIELDS = {"employment_status": 1, "is_deleted": 1, "reporting_lines": 1}
+
+# (manager node, line type, is_primary, effective_from, effective_to)
+Line = Tuple[int, str, bool, Optional[datetime], Optional[datetime]]
+
+
+def _line_applies(
+    line: Line,
+    as_of: Optional[datetime],
+    types: Optional[frozenset],
+    primary_only: bool
+) -> bool:
+    _, line_type, is_primary, effective_from, effective_to = line
+    if primary_only and not is_primary:
+        return False
+    if types is not None and line_type not in types:
+        return False
+    if as_of is not None:
+        if effective_from is not None and effective_from > as_of:
+            return False
+        if effective_to is not None and effective_to <= as_of:
+            return False
+    return True
+
+
+class OrgGraph:
+    """
+    Reporting graph of one tenant. Employees are interned to dense integer
+    nodes; `lines[n]` holds n's reporting lines (upward edges) and
+    `reports[n]` the nodes with a line to n (downward adjacency). Managers
+    that are not live employees still get a node, so edges to them survive
+    until the employee is reloaded.
+
+    Every walk takes the same edge filter: as_of (only lines effective at
+    that instant; None = every line), types (line types to follow; None =
+    all) and primary_only. Walks only pass through active employees.
+    """
+
+    def __init__(self):
+        self.ids: List[PydanticObjectId] = []
+        self.nodes: Dict[PydanticObjectId, int] = {}
+        self.lines: List[List[Line]] = []
+        self.reports: List[List[int]] = []
+        self.active = bytearray()
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def node(self, employee_id) -> int:
+        """Node of employee_id, interning it if unseen"""
+        node = self.nodes.get(employee_id)
+        if node is None:
+            node = self.nodes[employee_id] = len(self.ids)
+            self.ids.append(employee_id)
+            self.lines.append([])
+            self.reports.append([])
+            self.active.append(0)
+        return node
+
+    def is_expired(self) -> bool:
+        ttl = settings.ORG_GRAPH_TTL_SECONDS
+        return ttl > 0 and time.monotonic() - self.loaded_at > ttl
+
+    # ==================== UPDATES ====================
+
+    def set_employee(self, employee_id, active: bool, reporting_lines: Iterable[Any]):
+        """Replace one employee's state and reporting lines (dicts or ReportingLines)"""
+        node = self.node(employee_id)
+        self._unlink(node)
+        self.active[node] = 1 if active else 0
+
+        lines = []
+        for line in reporting_lines:
+            if isinstance(line, dict):
+                line = (line["manager_id"], line.get("type", ""), bool(line.get("is_primary")),
+                        line.get("effective_from"), line.get("effective_to"))
+            else:
+                line = (line.manager_id, line.type, line.is_primary,
+                        line.effective_from, line.effective_to)
+            manager = self.node(line[0])
+            lines.append((manager,) + line[1:])
+            self.reports[manager].append(node)
+        self.lines[node] = lines
+
+    def remove_employee(self, employee_id):
+        """Deactivate an employee and drop its upward edges"""
+        node = self.nodes.get(employee_id)
+        if node is not None:
+            self._unlink(node)
+            self.lines[node] = []
+            self.active[node] = 0
+
+    def _unlink(self, node: int):
+        for line in self.lines[node]:
+            self.reports[line[0]].remove(node)
+
+    # ==================== WALKS ====================
+
+    def managers(
+        self,
+        employee_id,
+        as_of: Optional[datetime] = None,
+        types: Optional[Iterable[str]] = None,
+        primary_only: bool = False
+    ) -> List[Tuple[PydanticObjectId, str, bool]]:
+        """(manager id, line type, is_primary) of the employee's matching lines"""
+        node = self.nodes.get(employee_id)
+        if node is None:
+            return []
+        types = frozenset(types) if types is not None else None
+        return [
+            (self.ids[line[0]], line[1], line[2]) for line in self.lines[node]
+            if _line_applies(line, as_of, types, primary_only)
+        ]
+
+    def direct_reports(
+        self,
+        manager_id,
+        as_of: Optional[datetime] = None,
+        types: Optional[Iterable[str]] = None,
+        primary_only: bool = False
+    ) -> List[PydanticObjectId]:
+        """Active employees with a matching line to manager_id"""
+        manager = self.nodes.get(manager_id)
+        if manager is None:
+            return []
+        types = frozenset(types) if types is not None else None
+        return [self.ids[node] for node in self._children(manager, as_of, types, primary_only)]
+
+    def span_of_control(self, manager_id, **edge_filter) -> int:
+        """Number of direct reports"""
+        return len(self.direct_reports(manager_id, **edge_filter))
+
+    def _children(self, manager: int, as_of, types, primary_only) -> List[int]:
+        children = []
+        for node in set(self.reports[manager]):
+            if not self.active[node]:
+                continue
+            for line in self.lines[node]:
+                if line[0] == manager and _line_applies(line, as_of, types, primary_only):
+                    children.append(node)
+                    break
+        return children
+
+    def all_reports(
+        self,
+        manager_id,
+        max_depth: Optional[int] = None,
+        as_of: Optional[datetime] = None,
+        types: Optional[Iterable[str]] = None,
+        primary_only: bool = False
+    ) -> List[Tuple[PydanticObjectId, int]]:
+        """
+        Direct and indirect reports as (employee id, level), breadth-first,
+        so each employee appears once at its shortest distance.
+        """
+        start = self.nodes.get(manager_id)
+        if start is None:
+            return []
+        types = frozenset(types) if types is not None else None
+        levels = {start: 0}
+        queue = deque([start])
+        result = []
+        while queue:
+            manager = queue.popleft()
+            level = levels[manager] + 1
+            if max_depth is not None and level > max_depth:
+                break
+            for node in self._children(manager, as_of, types, primary_only):
+                if node not in levels:
+                    levels[node] = level
+                    result.append((self.ids[node], level))
+                    queue.append(node)
+        return result
+
+    def chain_of_command(
+        self,
+        employee_id,
+        as_of: Optional[datetime] = None,
+        types: Optional[Iterable[str]] = None,
+        max_depth: Optional[int] = None
+    ) -> List[PydanticObjectId]:
+        """
+        Managers above the employee, nearest first, following primary
+        lines only. Stops at the top, where no primary line applies (dotted
+        or secondary lines are not part of the chain), at an inactive
+        manager or where the chain loops.
+        """
+        node = self.nodes.get(employee_id)
+        if node is None:
+            return []
+        types = frozenset(types) if types is not None else None
+        seen = {node}
+        chain = []
+        while max_depth is None or len(chain) < max_depth:
+            primary = next((line for line in self.lines[node]
+                            if _line_applies(line, as_of, types, True)), None)
+            if primary is None:
+                break
+            node = primary[0]
+            if node in seen or not self.active[node]:
+                break
+            seen.add(node)
+            chain.append(self.ids[node])
+        return chain
+
+    def would_create_cycle(self, employee_id, manager_id) -> bool:
+        """True if giving employee_id a line to manager_id closes a loop"""
+        if employee_id == manager_id:
+            return True
+        start = self.nodes.get(employee_id)
+        target = self.nodes.get(manager_id)
+        if start is None or target is None:
+            return False
+        # manager_id must not already be below employee_id on any line
+        seen = {start}
+        stack = [start]
+        while stack:
+            for node in self.reports[stack.pop()]:
+                if node == target:
+                    return True
+                if node not in seen:
+                    seen.add(node)
+                    stack.append(node)
+        return False
+
+    def cycles(
+        self,
+        as_of: Optional[datetime] = None,
+        types: Optional[Iterable[str]] = None,
+        primary_only: bool = False
+    ) -> List[List[PydanticObjectId]]:
+        """
+        Groups of employees that (indirectly) report to each other: the
+        strongly connected components with more than one member, plus
+        self-reporting employees. Iterative Tarjan, O(nodes + lines).
+        """
+        types = frozenset(types) if types is not None else None
+        upward = [
+            [line[0] for line in lines if _line_applies(line, as_of, types, primary_only)]
+            for lines in self.lines
+        ]
+
+        index: Dict[int, int] = {}
+        lowlink: Dict[int, int] = {}
+        on_stack = set()
+        stack: List[int] = []
+        found = []
+
+        for root in range(len(upward)):
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, edge = work.pop()
+                if edge == 0:
+                    index[node] = lowlink[node] = len(index)
+                    stack.append(node)
+                    on_stack.add(node)
+                recurse = False
+                edges = upward[node]
+                while edge < len(edges):
+                    target = edges[edge]
+                    edge += 1
+                    if target not in index:
+                        work.append((node, edge))
+                        work.append((target, 0))
+                        recurse = True
+                        break
+                    if target in on_stack:
+                        lowlink[node] = min(lowlink[node], index[target])
+                if recurse:
+                    continue
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in upward[node]:
+                        found.append([self.ids[member] for member in component])
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+        return found
+
+
+class OrgGraphCache:
+    """
+    Per-tenant reporting graph, loaded on first use from one projected
+    scan of the employee collection and patched from Employee write
+    events. Like the hierarchy cache, bulk writes bypass events and must
+    call invalidate(); ORG_GRAPH_TTL_SECONDS bounds staleness across
+    worker processes.
+    """
+
+    def __init__(self):
+        self._tenants: Dict[str, OrgGraph] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generations: Dict[str, int] = {}
+
+    @staticmethod
+    def tenant_key() -> str:
+        """Name of the database Employee is currently bound to"""
+        return Employee.get_motor_collection().database.name
+
+    async def get(self) -> OrgGraph:
+        key = self.tenant_key()
+        graph = self._tenants.get(key)
+        if graph is not None and not graph.is_expired():
+            return graph
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            graph = self._tenants.get(key)
+            if graph is None or graph.is_expired():
+                # Shared with primary-only routes: load from the primary
+                with primary_reads():
+                    graph = await self._load(key)
+        return graph
+
+    async def _load(self, key: str) -> OrgGraph:
+        generation = self._generations.get(key, 0)
+        graph = OrgGraph()
+        # Raw documents: model validation would dominate at 100k employees
+        cursor = Employee.get_motor_collection().find(
+            {"is_deleted": False}, GRAPH_FIELDS, batch_size=settings.EXPORT_BATCH_SIZE
+        )
+        async for doc in cursor:
+            graph.set_employee(
+                doc["_id"], doc.get("employment_status") == "active", doc.get("reporting_lines") or []
+            )
+
+        # Only publish if no write landed while we were reading
+        if self._generations.get(key, 0) == generation:
+            self._tenants[key] = graph
+        return graph
+
+    def apply(self, employee: Employee):
+        """Patch the cached graph after an Employee write (soft-deletes deactivate)"""
+        key = self.tenant_key()
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+        graph = self._tenants.get(key)
+        if graph is None or employee.id is None:
+            return
+
+        if employee.is_deleted:
+            graph.remove_employee(employee.id)
+        else:
+            graph.set_employee(employee.id, employee.employment_status == "active", employee.reporting_lines)
+
+    def evict(self, employee_id: PydanticObjectId):
+        """Drop a hard-deleted employee's edges"""
+        key = self.tenant_key()
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+        graph = self._tenants.get(key)
+        if graph is not None:
+            graph.remove_employee(employee_id)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Forget the cached graph (current tenant by default)"""
+        key = key or self.tenant_key()
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._tenants.pop(key, None)
+
+
+org_graph_cache = OrgGraphCache()
@@ -0,0 +1,48 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+from fastapi import Response
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Cursor could not be decoded"""
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque keyset cursor from the last row's sort key"""
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+    if not isinstance(values, list):
+        raise InvalidCursor("cursor must encode a list")
+    return values
+
+
+def paginate(rows: List[Any], limit: int, response: Response, key) -> List[Any]:
+    """
+    Trim a limit + 1 fetch to limit rows and advertise the next cursor.
+    key(row) returns the sort-key values the next request resumes after.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
+
+
+class PageParams:
+    """Keyset pagination query parameters (?limit=&cursor=)"""
+
+    def __init__(self, limit: int, after: Optional[List[Any]]):
+        self.limit = limit
+        self.after = after
@@ -0,0 +1,90 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+
+from config.settings import settings
+
+
+class HasherSaturated(RuntimeError):
+    """All hashing workers are busy and the wait queue is full"""
+
+
+class PasswordHasher:
+    """
+    bcrypt on a dedicated, size-limited thread pool.
+    bcrypt releases the GIL, so hashing off the event loop keeps other
+    requests moving. At most `max_workers` hashes run at once and at most
+    `max_queue` more may wait; beyond that callers get HasherSaturated
+    instead of piling up behind a login burst.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0  # running + waiting
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="password-hasher"
+            )
+        return self._executor
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        if self._pending >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise HasherSaturated("password hashing pool is saturated")
+
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    async def hash(self, password: str) -> str:
+        """bcrypt hash with a fresh salt"""
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """Constant-time bcrypt comparison"""
+        return await self._run(_verify, password, password_hash)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": min(self._pending, self.max_workers),
+            "queued": max(0, self._pending - self.max_workers),
+            "peak_pending": self._peak_pending,
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode(), password_hash.encode())
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
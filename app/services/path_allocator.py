@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Optional, Type
+
+from beanie import Document, PydanticObjectId
+from pymongo import ReturnDocument
+
+from app.models.company import Company
+from app.models.materialized_path import MAX_SEGMENT, child_path, path_segments
+from app.models.path_counter import PathCounter
+
+
+class PathSegmentOverflow(RuntimeError):
+    """Parent already has MAX_SEGMENT children; no segment fits the fixed width"""
+
+
+def counter_key(model: Type[Document], parent_id, company_id) -> dict:
+    """
+    Counter row of a parent. Department and branch paths restart in every
+    company, so their counters (top level included) are per company;
+    companies form one tree and pass company_id=None.
+    """
+    return {"hierarchy": model.get_collection_name(), "company_id": company_id, "parent_id": parent_id}
+
+
+async def _seed_counter(model: Type[Document], parent_id, company_id, session):
+    """
+    First allocation under a parent: create the counter at the highest
+    segment already in use. A single upsert with $setOnInsert, so a
+    concurrent seeder leaves the existing row alone instead of failing
+    (no DuplicateKeyError to catch, which would abort a surrounding
+    transaction such as a subtree move).
+    """
+    siblings = {model.parent_field: parent_id, "materialized_path": {"$ne": None}}
+    if company_id is not None:
+        siblings["company_id"] = company_id
+    last = await model.get_motor_collection().find_one(
+        siblings,
+        {"materialized_path": 1},
+        sort=[("materialized_path", -1)],
+        session=session
+    )
+    highest = int(path_segments(last["materialized_path"])[-1]) if last else 0
+    await PathCounter.get_motor_collection().find_one_and_update(
+        counter_key(model, parent_id, company_id),
+        {"$setOnInsert": {"last_segment": highest, "updated_at": datetime.utcnow()}},
+        upsert=True,
+        session=session
+    )
+
+
+async def allocate_child_path(
+    model: Type[Document],
+    parent: Optional[Document],
+    company_id: Optional[PydanticObjectId] = None,
+    session=None
+) -> str:
+    """
+    Next free path under parent (None = top level of company_id's
+    departments/branches, or of the company tree), from one atomic
+    findOneAndUpdate($inc); no sibling scan except the first time a parent
+    gets a child through the counter. Segments are never reused, and the
+    1000th child raises PathSegmentOverflow rather than widening the
+    segment (which would break path ordering and range queries).
+    """
+    parent_id = parent.id if parent else None
+    counter_filter = counter_key(model, parent_id, company_id)
+    increment = {"$inc": {"last_segment": 1}, "$set": {"updated_at": datetime.utcnow()}}
+    counters = PathCounter.get_motor_collection()
+
+    counter = await counters.find_one_and_update(
+        counter_filter, increment, return_document=ReturnDocument.AFTER, session=session
+    )
+    if counter is None:
+        await _seed_counter(model, parent_id, company_id, session)
+        counter = await counters.find_one_and_update(
+            counter_filter, increment, return_document=ReturnDocument.AFTER, session=session
+        )
+
+    segment = counter["last_segment"]
+    if segment > MAX_SEGMENT:
+        raise PathSegmentOverflow(
+            f"{model.__name__} parent {parent_id or 'top level'} already has {MAX_SEGMENT} children"
+        )
+    return child_path(parent.materialized_path if parent else None, segment)
+
+
+async def assign_path(node: Document):
+    """
+    Fill materialized_path, depth and root_id of a node about to be
+    inserted, from its parent. Nodes that already carry a path are left
+    alone, as is a parentless company (the root, whose path is None).
+    """
+    if node.materialized_path:
+        return
+    parent_id = getattr(node, node.parent_field)
+    if parent_id is None and isinstance(node, Company):
+        return
+
+    parent = await type(node).get(parent_id) if parent_id else None
+    if parent_id and parent is None:
+        raise LookupError(f"Parent {type(node).__name__.lower()} not found")
+
+    company_id = None if isinstance(node, Company) else node.company_id
+    node.materialized_path = await allocate_child_path(type(node), parent, company_id)
+    node.depth = parent.depth + 1 if parent else 0
+    if parent is not None:
+        node.root_id = parent.root_id or parent.id
+    elif node.root_id is None:
+        # Top-level nodes are their own root; pick the id now so it can be stored
+        node.id = node.id or PydanticObjectId()
+        node.root_id = node.id
@@ -0,0 +1,294 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from beanie import PydanticObjectId
+
+from app.models.employee import Employee
+from app.models.materialized_path import scope_filter
+from app.models.role import Role
+from app.models.user import User
+from app.models.user_access import COMPANY_QUALIFIED_SCOPES, UserAccess
+from app.services.scope_index import GLOBAL_SCOPE, ScopeIndex
+from config.settings import settings
+
+# Grants of this type (or with path_limit "*") apply to every hierarchy
+GLOBAL_SCOPE_TYPE = "GLOBAL"
+
+# Scope index key: (scope type, company for department/branch grants)
+ScopeKey = Tuple[str, Optional[PydanticObjectId]]
+
+
+def scope_key(scope_type: str, company_id: Optional[PydanticObjectId]) -> ScopeKey:
+    return (scope_type, company_id if scope_type in COMPANY_QUALIFIED_SCOPES else None)
+
+
+async def holder_company(user_id: PydanticObjectId) -> Optional[PydanticObjectId]:
+    """Employer company of a grant holder (None without a linked employee)"""
+    user_doc = await User.get_motor_collection().find_one({"_id": user_id}, {"employee_id": 1})
+    if not user_doc or not user_doc.get("employee_id"):
+        return None
+    employee_doc = await Employee.get_motor_collection().find_one(
+        {"_id": user_doc["employee_id"]}, {"company_id": 1}
+    )
+    return employee_doc.get("company_id") if employee_doc else None
+
+
+class ScopedGrant:
+    """One active UserAccess row with its role permissions and overrides applied"""
+
+    __slots__ = ("role_name", "scope_type", "path_limit", "depth_limit", "company_id", "permissions")
+
+    def __init__(self, access: UserAccess, role: Role, company_id: Optional[PydanticObjectId] = None):
+        self.role_name = role.display_name
+        self.scope_type = access.scope_type
+        self.path_limit = access.path_limit
+        self.depth_limit = access.depth_limit
+        # Rows written before company_id existed fall back to the holder's employer
+        self.company_id = access.company_id or company_id
+        # Overrides win over the role template (both grant and revoke)
+        self.permissions: Dict[str, bool] = {**(role.permissions or {}), **(access.overrides or {})}
+
+    @classmethod
+    def restore(cls, role_name: str, scope_type: str, path_limit: Optional[str],
+                depth_limit: Optional[int], permissions: Iterable[str],
+                company_id: Optional[PydanticObjectId] = None) -> "ScopedGrant":
+        """Rebuild a grant from its serialized form (granted permissions only)"""
+        grant = cls.__new__(cls)
+        grant.role_name = role_name
+        grant.scope_type = scope_type
+        grant.path_limit = path_limit
+        grant.depth_limit = depth_limit
+        grant.company_id = company_id
+        grant.permissions = {perm: True for perm in permissions}
+        return grant
+
+
+class EffectivePermissions:
+    """
+    Compiled permissions for one user.
+    Built from UserAccess + Role once, then answered from memory.
+    """
+
+    def __init__(
+        self,
+        user_id: PydanticObjectId,
+        grants: List[ScopedGrant],
+        expires_at: float,
+        next_change: Optional[datetime] = None
+    ):
+        self.user_id = user_id
+        self.grants = grants
+        self.expires_at = expires_at
+        # Next valid_from/valid_until boundary (UTC) after which the grants differ
+        self.next_change = next_change
+
+        # Merged view across grants (granted anywhere wins)
+        self.permissions: Dict[str, bool] = {}
+        # Company, department and branch paths are separate namespaces
+        # ("001" names a different node in each), and department/branch
+        # paths restart in every company, so each scope type (per company
+        # for departments/branches) gets its own index; only global grants
+        # cross between them.
+        self.global_permissions: Set[str] = set()
+        self.scope_indexes: Dict[ScopeKey, ScopeIndex] = {}
+        for grant in grants:
+            for perm, value in grant.permissions.items():
+                self.permissions[perm] = self.permissions.get(perm, False) or bool(value)
+            granted = [perm for perm, value in grant.permissions.items() if value]
+            if grant.scope_type == GLOBAL_SCOPE_TYPE or grant.path_limit == GLOBAL_SCOPE:
+                self.global_permissions.update(granted)
+            else:
+                key = scope_key(grant.scope_type, grant.company_id)
+                self.scope_indexes.setdefault(key, ScopeIndex()).add(
+                    grant.path_limit, grant.depth_limit, granted
+                )
+
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def has(self, permission: str) -> bool:
+        """Granted somewhere, regardless of scope"""
+        return self.permissions.get(permission, False)
+
+    def allows(
+        self,
+        permission: str,
+        resource_path: Optional[str],
+        scope_type: str,
+        company_path: Optional[str] = None,
+        company_id: Optional[PydanticObjectId] = None
+    ) -> bool:
+        """
+        Granted on a scope_type scope that covers resource_path (segment and
+        depth aware), or globally. For department/branch resources, pass the
+        owning company's path and id: its department/branch grants apply,
+        and so do COMPANY grants covering the company.
+        """
+        if permission in self.global_permissions:
+            return True
+        index = self.scope_indexes.get(scope_key(scope_type, company_id))
+        if index is not None and index.allows(permission, resource_path):
+            return True
+        if scope_type != "COMPANY" and company_path:
+            return self.allows(permission, company_path, "COMPANY")
+        return False
+
+    def scope_filter(
+        self,
+        permissions: Iterable[str],
+        field: str,
+        scope_type: str,
+        company_paths: Optional[Dict[PydanticObjectId, Optional[str]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Mongo filter restricting documents with a company_id and field (a
+        scope_type path) to the scopes granting any of the permissions:
+        {} when unrestricted, None when nothing is granted. company_paths
+        (live company id -> path, see HierarchyCache.company_paths) lets
+        COMPANY grants admit every document of the companies they cover.
+        """
+        permissions = set(permissions)
+        if permissions & self.global_permissions:
+            return {}
+
+        clauses = []
+        for (grant_type, company_id), index in self.scope_indexes.items():
+            if grant_type != scope_type or grant_type == "COMPANY":
+                continue
+            scopes = index.scopes(permissions)
+            if scopes is None:
+                clauses.append({"company_id": company_id})
+            elif scopes:
+                clauses.append({"company_id": company_id, **scope_filter(scopes, field)})
+
+        company_index = self.scope_indexes.get(scope_key("COMPANY", None))
+        if company_index is not None and company_paths:
+            covered = [
+                company_id for company_id, path in company_paths.items()
+                if any(company_index.allows(permission, path) for permission in permissions)
+            ]
+            if covered:
+                clauses.append({"company_id": {"$in": covered}})
+
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$or": clauses}
+
+    def roles_info(self) -> List[Dict[str, Any]]:
+        return [{
+            "role": grant.role_name,
+            "scope_type": grant.scope_type,
+            "path_limit": grant.path_limit
+        } for grant in self.grants]
+
+
+class PermissionCache:
+    """
+    Bounded LRU + TTL cache of EffectivePermissions per (tenant, user).
+    UserAccess writes invalidate the affected user; Role writes invalidate
+    the whole tenant. Grants that start or expire inside the TTL window
+    shorten the entry's lifetime so validity dates are honoured. Like the
+    hierarchy cache, a compile that raced an invalidation of its tenant is
+    returned but not stored.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], EffectivePermissions]" = OrderedDict()
+        # Held only while a compile is in flight
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._generations: Dict[str, int] = {}
+
+    @staticmethod
+    def tenant_key() -> str:
+        """Name of the database UserAccess is currently bound to"""
+        return UserAccess.get_motor_collection().database.name
+
+    async def get(self, user_id: PydanticObjectId) -> EffectivePermissions:
+        key = (self.tenant_key(), str(user_id))
+        compiled = self._entries.get(key)
+        if compiled is not None and not compiled.is_expired():
+            self._entries.move_to_end(key)
+            return compiled
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                compiled = self._entries.get(key)
+                if compiled is None or compiled.is_expired():
+                    generation = self._generations.get(key[0], 0)
+                    compiled = await self.compile(user_id)
+                    # Only publish if no invalidation landed while we were reading
+                    if self._generations.get(key[0], 0) == generation:
+                        self._store(key, compiled)
+        finally:
+            if self._locks.get(key) is lock and not lock.locked():
+                del self._locks[key]
+        return compiled
+
+    def _store(self, key: Tuple[str, str], compiled: EffectivePermissions):
+        self._entries[key] = compiled
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def compile(self, user_id: PydanticObjectId) -> EffectivePermissions:
+        """Build EffectivePermissions with two queries (grants, then roles)"""
+        now = datetime.utcnow()
+        expires_at = time.monotonic() + settings.PERMISSION_CACHE_TTL_SECONDS
+
+        access_grants = await UserAccess.find(
+            UserAccess.user_id == user_id,
+            UserAccess.is_active == True
+        ).to_list()
+
+        role_ids = list({access.role_id for access in access_grants})
+        roles = {
+            role.id: role
+            for role in await Role.find({"_id": {"$in": role_ids}}).to_list()
+        } if role_ids else {}
+
+        # Department/branch grants without company_id predate the field
+        holder = None
+        if any(access.company_id is None and access.scope_type in COMPANY_QUALIFIED_SCOPES
+               for access in access_grants):
+            holder = await holder_company(user_id)
+
+        grants = []
+        next_change = None
+        for access in access_grants:
+            # Expire the entry when a grant starts or ends
+            for boundary in (access.valid_from, access.valid_until):
+                if boundary and boundary > now:
+                    expires_at = min(expires_at, time.monotonic() + (boundary - now).total_seconds())
+                    next_change = min(next_change or boundary, boundary)
+
+            if access.valid_from and access.valid_from > now:
+                continue
+            if access.valid_until and access.valid_until <= now:
+                continue
+
+            role = roles.get(access.role_id)
+            if role:
+                grants.append(ScopedGrant(access, role, holder))
+
+        return EffectivePermissions(user_id, grants, expires_at, next_change)
+
+    def invalidate(self, user_id: PydanticObjectId):
+        tenant = self.tenant_key()
+        self._generations[tenant] = self._generations.get(tenant, 0) + 1
+        self._entries.pop((tenant, str(user_id)), None)
+
+    def invalidate_tenant(self):
+        tenant = self.tenant_key()
+        self._generations[tenant] = self._generations.get(tenant, 0) + 1
+        for key in [key for key in self._entries if key[0] == tenant]:
+            del self._entries[key]
+
+
+permission_cache = PermissionCache(max_entries=settings.PERMISSION_CACHE_MAX_ENTRIES)
@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Any, Dict
+
+from pymongo import monitoring
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters per server, fed by pymongo pool events.
+    Events fire on Motor's worker threads, so updates take a lock; a
+    checkout's wait is timed on the thread that requested it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers: Dict[str, Dict[str, Any]] = {}
+        self._local = threading.local()
+
+    def _server(self, address) -> Dict[str, Any]:
+        key = "%s:%s" % address
+        server = self._servers.get(key)
+        if server is None:
+            server = self._servers[key] = {
+                "open": 0,           # connections currently established
+                "checked_out": 0,    # in use by an operation
+                "waiting": 0,        # operations queued for a connection
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "pool_clears": 0,
+                "wait_ms_total": 0.0,
+                "wait_ms_max": 0.0
+            }
+        return server
+
+    # ---- pool lifecycle ----
+    def pool_created(self, event):
+        with self._lock:
+            self._server(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._server(event.address)["pool_clears"] += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._servers.pop("%s:%s" % event.address, None)
+
+    # ---- connections ----
+    def connection_created(self, event):
+        with self._lock:
+            self._server(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._server(event.address)["open"] -= 1
+
+    # ---- checkouts ----
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self._server(event.address)["waiting"] += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server["waiting"] -= 1
+            server["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        waited = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+        with self._lock:
+            server = self._server(event.address)
+            server["waiting"] -= 1
+            server["checked_out"] += 1
+            server["checkouts"] += 1
+            server["wait_ms_total"] += waited
+            server["wait_ms_max"] = max(server["wait_ms_max"], waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._server(event.address)["checked_out"] -= 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            servers = {key: dict(server) for key, server in self._servers.items()}
+        for server in servers.values():
+            total_wait = server.pop("wait_ms_total")
+            server["wait_ms_avg"] = round(total_wait / server["checkouts"], 3) if server["checkouts"] else 0.0
+            server["wait_ms_max"] = round(server["wait_ms_max"], 3)
+        return servers
+
+
+pool_stats = PoolStats()
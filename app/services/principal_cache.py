@@ -0,0 +1,146 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+
+from app.models.employee import Employee
+from app.models.tenant_routing import primary_reads
+from app.models.user import User
+from config.settings import settings
+
+
+class EmployeeIdentity:
+    """Slim employee record attached to an authenticated principal"""
+
+    __slots__ = ("id", "employee_code", "display_name", "department_id",
+                 "department_path", "branch_id", "branch_path")
+
+    def __init__(self, doc: dict):
+        self.id: PydanticObjectId = doc["_id"]
+        self.employee_code: str = doc.get("employee_code")
+        self.display_name: str = doc.get("display_name")
+        self.department_id: Optional[PydanticObjectId] = doc.get("department_id")
+        self.department_path: Optional[str] = doc.get("department_path")
+        self.branch_id: Optional[PydanticObjectId] = doc.get("branch_id")
+        self.branch_path: Optional[str] = doc.get("branch_path")
+
+
+class Principal:
+    """Slim authenticated identity (what request handlers need from User)"""
+
+    __slots__ = ("id", "email", "full_name", "is_active", "is_locked",
+                 "is_deleted", "employee_id", "employee", "loaded_at", "permissions")
+
+    def __init__(self, user_doc: dict, employee: Optional[EmployeeIdentity]):
+        self.id: PydanticObjectId = user_doc["_id"]
+        self.email: str = user_doc.get("email")
+        self.full_name: str = user_doc.get("full_name")
+        self.is_active: bool = user_doc.get("is_active", True)
+        self.is_locked: bool = user_doc.get("is_locked", False)
+        self.is_deleted: bool = user_doc.get("is_deleted", False)
+        self.employee_id: Optional[PydanticObjectId] = user_doc.get("employee_id")
+        self.employee = employee
+        self.loaded_at = time.monotonic()
+        # Compiled permissions when carried by a scoped token, else loaded on demand
+        self.permissions = None
+
+    @property
+    def can_authenticate(self) -> bool:
+        return self.is_active and not self.is_locked and not self.is_deleted
+
+
+USER_FIELDS = ["email", "full_name", "is_active", "is_locked", "is_deleted", "employee_id"]
+EMPLOYEE_FIELDS = ["employee_code", "display_name", "department_id",
+                   "department_path", "branch_id", "branch_path"]
+
+
+class PrincipalCache:
+    """
+    Bounded LRU + TTL cache of Principals keyed by (tenant, user id).
+    User and Employee writes invalidate the affected entry; the TTL bounds
+    staleness for writes made by other worker processes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Principal]" = OrderedDict()
+
+    @staticmethod
+    def tenant_key() -> str:
+        """Name of the database User is currently bound to"""
+        return User.get_motor_collection().database.name
+
+    async def get(self, user_id: str) -> Optional[Principal]:
+        key = (self.tenant_key(), str(user_id))
+        principal = self._entries.get(key)
+        if principal is not None and time.monotonic() - principal.loaded_at < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            return principal
+
+        # Reused by later requests, so never loaded from a lagging secondary
+        with primary_reads():
+            principal = await self.load(user_id)
+        if principal is None:
+            self._entries.pop(key, None)
+            return None
+
+        self._entries[key] = principal
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return principal
+
+    async def load(self, user_id: str) -> Optional[Principal]:
+        """User + linked Employee, projected to the identity fields"""
+        try:
+            user_oid = PydanticObjectId(user_id)
+        except (InvalidId, TypeError):
+            return None
+
+        user_doc = await User.get_motor_collection().find_one(
+            {"_id": user_oid},
+            {field: 1 for field in USER_FIELDS}
+        )
+        if user_doc is None:
+            return None
+
+        employee = None
+        if user_doc.get("employee_id"):
+            employee_doc = await Employee.get_motor_collection().find_one(
+                {"_id": user_doc["employee_id"]},
+                {field: 1 for field in EMPLOYEE_FIELDS}
+            )
+            if employee_doc is not None:
+                employee = EmployeeIdentity(employee_doc)
+
+        return Principal(user_doc, employee)
+
+    def invalidate(self, user_id: PydanticObjectId):
+        self._entries.pop((self.tenant_key(), str(user_id)), None)
+
+    def invalidate_tenant(self):
+        tenant = self.tenant_key()
+        for key in [key for key in self._entries if key[0] == tenant]:
+            del self._entries[key]
+
+    def invalidate_employee(self, employee_id: PydanticObjectId, user_id: Optional[PydanticObjectId] = None):
+        """Drop principals linked to an employee (by user_id if known, else by scan)"""
+        if user_id is not None:
+            self.invalidate(user_id)
+            return
+        tenant = self.tenant_key()
+        stale = [
+            key for key, principal in self._entries.items()
+            if key[0] == tenant and principal.employee_id == employee_id
+        ]
+        for key in stale:
+            del self._entries[key]
+
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
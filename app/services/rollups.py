@@ -0,0 +1,282 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Type
+
+from beanie import Document, PydanticObjectId
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.models.branch import Branch
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.materialized_path import ancestor_paths
+from app.models.tenant_routing import bind_database, primary_reads, reset_database
+from app.services.tenants import tenant_registry
+from config.database import METADATA_DB, Database
+from config.settings import settings
+
+# Employees counted by rollups (same rule as the active-employee listings)
+COUNTED = {"employment_status": "active", "is_deleted": False}
+
+# Lease (in the metadata database) electing the one process that reconciles
+LEASES_COLLECTION = "leases"
+RECONCILE_LEASE = "rollup-reconcile"
+
+
+class RollupSpec:
+    """An Employee placement field counted into a hierarchy's nodes"""
+
+    __slots__ = ("model", "employee_field", "direct_field", "subtree_field")
+
+    def __init__(self, model: Type[Document], employee_field: str, direct_field: str, subtree_field: str):
+        self.model = model
+        self.employee_field = employee_field  # Employee field holding the node id
+        self.direct_field = direct_field      # node field: employees placed on the node
+        self.subtree_field = subtree_field    # node field: ... on the node or below
+
+
+ROLLUPS = [
+    RollupSpec(Department, "department_id", "headcount", "subtree_headcount"),
+    RollupSpec(Branch, "branch_id", "current_occupancy", "subtree_occupancy"),
+]
+
+# Employee fields rollups depend on (prior-placement reads project these)
+PLACEMENT_FIELDS = {
+    "employment_status": 1,
+    "is_deleted": 1,
+    **{spec.employee_field: 1 for spec in ROLLUPS}
+}
+
+# A counted employee's node per rollup field, None for uncounted employees
+Placement = Optional[Dict[str, Optional[PydanticObjectId]]]
+
+
+def placement(employee: Any) -> Placement:
+    """Where an Employee (or raw employee document) counts, if at all"""
+    doc = employee if isinstance(employee, dict) else {
+        "employment_status": employee.employment_status,
+        "is_deleted": employee.is_deleted,
+        **{spec.employee_field: getattr(employee, spec.employee_field) for spec in ROLLUPS}
+    }
+    if doc.get("employment_status") != "active" or doc.get("is_deleted"):
+        return None
+    return {spec.employee_field: doc.get(spec.employee_field) for spec in ROLLUPS}
+
+
+class RollupEngine:
+    """
+    Direct and subtree employee counts on hierarchy nodes, kept current
+    with $inc: a hire/termination touches the node and its ancestors, a
+    transfer only the two branches below their common ancestor, all in one
+    bulk write. Employee events supply the prior placement (one projected
+    read before each write); bulk employee writes bypass events and are
+    repaired by reconcile(), which runs for every tenant at startup (the
+    initial backfill) and then every HEADCOUNT_RECONCILE_SECONDS, in
+    whichever worker process holds the reconcile lease for that interval.
+    """
+
+    def __init__(self, reconcile_seconds: int):
+        self.reconcile_seconds = reconcile_seconds
+        self.holder = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+    async def placement_of(self, employee_id: Optional[PydanticObjectId]) -> Placement:
+        """Stored placement of an employee (before a write changes it)"""
+        if employee_id is None:
+            return None
+        with primary_reads():
+            doc = await Employee.get_motor_collection().find_one({"_id": employee_id}, PLACEMENT_FIELDS)
+        return placement(doc) if doc else None
+
+    async def record(self, prior: Placement, current: Placement):
+        """Apply the count changes of an employee moving from prior to current"""
+        for spec in ROLLUPS:
+            old = prior.get(spec.employee_field) if prior else None
+            new = current.get(spec.employee_field) if current else None
+            if old != new:
+                await self._shift(spec, old, new)
+
+    async def _shift(self, spec: RollupSpec, old, new):
+        with primary_reads():
+            collection = spec.model.get_motor_collection()
+        nodes = {
+            doc["_id"]: doc
+            async for doc in collection.find(
+                {"_id": {"$in": [node_id for node_id in (old, new) if node_id]}},
+                {"materialized_path": 1, "company_id": 1}
+            )
+        }
+
+        def ancestors(node_id):
+            node = nodes.get(node_id)
+            if node is None:
+                return node, set()
+            return node, set(ancestor_paths(node.get("materialized_path")))
+
+        old_node, old_ancestors = ancestors(old)
+        new_node, new_ancestors = ancestors(new)
+        if old_node and new_node and old_node.get("company_id") == new_node.get("company_id"):
+            # Counts above the common ancestor do not change
+            shared = old_ancestors & new_ancestors
+            old_ancestors -= shared
+            new_ancestors -= shared
+
+        ops = []
+        for node, paths, delta in ((old_node, old_ancestors, -1), (new_node, new_ancestors, 1)):
+            if node is None:
+                continue
+            ops.append(UpdateOne(
+                {"_id": node["_id"]},
+                {"$inc": {spec.direct_field: delta, spec.subtree_field: delta}}
+            ))
+            if paths:
+                ops.append(UpdateMany(
+                    {"company_id": node.get("company_id"), "materialized_path": {"$in": sorted(paths)}},
+                    {"$inc": {spec.subtree_field: delta}}
+                ))
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+
+    async def move_subtree(
+        self,
+        model: Type[Document],
+        node_id: PydanticObjectId,
+        old_path: str,
+        new_parent_path: Optional[str],
+        session=None
+    ):
+        """Carry a moved node's subtree counts from its old ancestors to its new ones"""
+        for spec in ROLLUPS:
+            if spec.model is not model:
+                continue
+            collection = model.get_motor_collection()
+            node = await collection.find_one(
+                {"_id": node_id}, {spec.subtree_field: 1, "company_id": 1}, session=session
+            )
+            amount = (node or {}).get(spec.subtree_field) or 0
+            if not amount:
+                continue
+
+            old_ancestors = set(ancestor_paths(old_path))
+            new_ancestors = set(ancestor_paths(new_parent_path, include_self=True))
+            shared = old_ancestors & new_ancestors
+            ops = [
+                UpdateMany(
+                    {"company_id": node.get("company_id"), "materialized_path": {"$in": sorted(paths)}},
+                    {"$inc": {spec.subtree_field: delta}}
+                )
+                for paths, delta in ((old_ancestors - shared, -amount), (new_ancestors - shared, amount))
+                if paths
+            ]
+            if ops:
+                await collection.bulk_write(ops, ordered=False, session=session)
+
+    # ==================== RECONCILIATION ====================
+
+    async def reconcile(self) -> Dict[str, int]:
+        """
+        Recount every rollup of the current tenant from the employee
+        collection (one $group per rollup) and rewrite the nodes whose
+        counts drifted. Returns the number of nodes corrected per rollup.
+        """
+        corrected = {}
+        for spec in ROLLUPS:
+            field = "$" + spec.employee_field
+            direct = {
+                row["_id"]: row["count"]
+                async for row in Employee.get_motor_collection().aggregate([
+                    {"$match": {**COUNTED, spec.employee_field: {"$ne": None}}},
+                    {"$group": {"_id": field, "count": {"$sum": 1}}}
+                ])
+            }
+
+            collection = spec.model.get_motor_collection()
+            nodes = [doc async for doc in collection.find({}, {
+                "materialized_path": 1, "company_id": 1, spec.direct_field: 1, spec.subtree_field: 1
+            })]
+            by_path = {(doc.get("company_id"), doc.get("materialized_path")): doc["_id"] for doc in nodes}
+            subtree = {doc["_id"]: 0 for doc in nodes}
+            for doc in nodes:
+                count = direct.get(doc["_id"], 0)
+                subtree[doc["_id"]] += count
+                for path in ancestor_paths(doc.get("materialized_path")):
+                    ancestor = by_path.get((doc.get("company_id"), path))
+                    if ancestor is not None:
+                        subtree[ancestor] += count
+
+            ops = [
+                UpdateOne({"_id": doc["_id"]}, {"$set": {
+                    spec.direct_field: direct.get(doc["_id"], 0),
+                    spec.subtree_field: subtree[doc["_id"]]
+                }})
+                for doc in nodes
+                if doc.get(spec.direct_field, 0) != direct.get(doc["_id"], 0)
+                or doc.get(spec.subtree_field, 0) != subtree[doc["_id"]]
+            ]
+            if ops:
+                await collection.bulk_write(ops, ordered=False)
+            corrected[spec.subtree_field] = len(ops)
+        return corrected
+
+    async def reconcile_all(self):
+        """Reconcile the default database and every registered tenant"""
+        names = {settings.DEFAULT_TENANT_DATABASE}
+        names.update(route.database_name for route in tenant_registry.routes() if not route.is_blocked)
+        for name in sorted(names):
+            token = bind_database(await Database.tenant_database(name))
+            try:
+                corrected = await self.reconcile()
+                if any(corrected.values()):
+                    print(f"⚠️ Rollups drifted in {name}, corrected: {corrected}")
+            except PyMongoError as exc:
+                print(f"⚠️ Rollup reconciliation failed for {name}: {exc}")
+            finally:
+                reset_database(token)
+
+    async def acquire_lease(self) -> bool:
+        """
+        Take the reconcile lease for one interval if it is free or expired;
+        False while another process holds it. Expired leases are taken over
+        by the upsert, live ones make it collide on _id.
+        """
+        now = datetime.utcnow()
+        leases = Database.client[METADATA_DB][LEASES_COLLECTION]
+        try:
+            lease = await leases.find_one_and_update(
+                {"_id": RECONCILE_LEASE, "expires_at": {"$lte": now}},
+                {"$set": {"holder": self.holder,
+                          "expires_at": now + timedelta(seconds=self.reconcile_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return False
+        return lease is not None and lease.get("holder") == self.holder
+
+    async def run(self):
+        while True:
+            try:
+                leased = await self.acquire_lease()
+            except PyMongoError as exc:
+                print(f"⚠️ Rollup reconcile lease unavailable: {exc}")
+                leased = False
+            if leased:
+                await self.reconcile_all()
+            await asyncio.sleep(self.reconcile_seconds)
+
+    def start(self):
+        if self.reconcile_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+rollups = RollupEngine(reconcile_seconds=settings.HEADCOUNT_RECONCILE_SECONDS)
@@ -0,0 +1,89 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.materialized_path import PATH_SEPARATOR, path_segments
+
+GLOBAL_SCOPE = "*"
+
+# Relative depth for grants without depth_limit
+UNLIMITED = float("inf")
+
+
+class _ScopeNode:
+    __slots__ = ("children", "grants")
+
+    def __init__(self):
+        self.children: Dict[str, "_ScopeNode"] = {}
+        # permission -> deepest level below this node the grant reaches
+        self.grants: Dict[str, float] = {}
+
+
+class ScopeIndex:
+    """
+    Trie over materialized_path segments for one user's grants.
+    Each node records the permissions granted at that path and how far
+    below it they reach (UserAccess.depth_limit), so an authorization
+    check walks the resource path once: O(path depth), independent of the
+    number of grants.
+    """
+
+    def __init__(self):
+        self.root = _ScopeNode()
+        self.global_permissions: Set[str] = set()
+
+    def add(self, path_limit: str, depth_limit: Optional[int], permissions: Iterable[str]):
+        """Register permissions granted on path_limit (and below)"""
+        permissions = list(permissions)
+        if path_limit == GLOBAL_SCOPE:
+            self.global_permissions.update(permissions)
+            return
+
+        reach = UNLIMITED if depth_limit is None else depth_limit
+        node = self.root
+        for segment in path_segments(path_limit):
+            node = node.children.setdefault(segment, _ScopeNode())
+        for perm in permissions:
+            node.grants[perm] = max(node.grants.get(perm, -1), reach)
+
+    def allows(self, permission: str, resource_path: Optional[str]) -> bool:
+        """Is resource_path inside a scope that grants permission?"""
+        if permission in self.global_permissions:
+            return True
+
+        segments = path_segments(resource_path)
+        node = self.root
+        for matched, segment in enumerate(segments, start=1):
+            node = node.children.get(segment)
+            if node is None:
+                return False
+            reach = node.grants.get(permission)
+            if reach is not None and len(segments) - matched <= reach:
+                return True
+        return False
+
+    def scopes(self, permissions: Iterable[str]) -> Optional[List[Tuple[str, Optional[int]]]]:
+        """
+        Minimal (path, depth_limit) list covering every scope that grants
+        any of the permissions; scopes nested inside a wider grant are
+        dropped. None means unrestricted (a global grant).
+        """
+        permissions = set(permissions)
+        if permissions & self.global_permissions:
+            return None
+
+        result: List[Tuple[str, Optional[int]]] = []
+
+        def walk(node: _ScopeNode, segments: List[str], covered: float):
+            # covered: how many more levels an ancestor grant still reaches
+            reach = max((node.grants.get(perm, -1) for perm in permissions), default=-1)
+            if reach > covered:
+                result.append((
+                    PATH_SEPARATOR.join(segments),
+                    None if reach == UNLIMITED else int(reach)
+                ))
+                covered = reach
+            for segment, child in node.children.items():
+                walk(child, segments + [segment], covered - 1)
+
+        for segment, child in self.root.children.items():
+            walk(child, [segment], -1)
+        return result
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import PyMongoError
+
+from app.models.tenant import Tenant
+from config.settings import settings
+
+# Tenants in these states resolve but are refused (403) by the middleware
+BLOCKED_TENANT_STATUSES = ("suspended", "inactive", "deleted")
+
+
+class TenantRoute:
+    """Routing facts for one tenant (what requests need from Tenant)"""
+
+    __slots__ = ("id", "tenant_id", "name", "database_name", "domain", "status")
+
+    def __init__(self, doc: dict):
+        self.id = doc["_id"]
+        self.tenant_id: str = doc["tenant_id"]
+        self.name: str = doc.get("name")
+        self.database_name: str = doc["database_name"]
+        self.domain: Optional[str] = doc.get("domain")
+        self.status: str = doc.get("status", "active")
+
+    @property
+    def is_blocked(self) -> bool:
+        return self.status in BLOCKED_TENANT_STATUSES
+
+
+ROUTE_FIELDS = ["tenant_id", "name", "database_name", "domain", "status"]
+
+
+class TenantRegistry:
+    """
+    In-memory tenant directory, loaded whole from hrms_metadata.
+    A change stream applies Tenant writes as they happen; where change
+    streams are unavailable (standalone mongod) it polls every
+    TENANT_REFRESH_SECONDS instead. Lookups never wait on the database:
+    if neither has synced within TENANT_REGISTRY_TTL_SECONDS the next
+    lookup starts a background reload and is served from the last
+    snapshot, so a dead watcher cannot leave a suspended tenant unblocked
+    for long.
+    """
+
+    def __init__(self, refresh_seconds: int, ttl_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self.ttl_seconds = ttl_seconds
+        self._by_oid: Dict[Any, TenantRoute] = {}
+        self._by_tenant_id: Dict[str, TenantRoute] = {}
+        self._by_domain: Dict[str, TenantRoute] = {}
+        self.synced_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._reload: Optional[asyncio.Task] = None
+
+    def is_stale(self) -> bool:
+        return self.synced_at is None or time.monotonic() - self.synced_at > self.ttl_seconds
+
+    async def resolve(self, tenant_id: Optional[str], host: Optional[str]) -> Optional[TenantRoute]:
+        """Explicit tenant id wins over the request host"""
+        if self.is_stale():
+            self._reload_in_background()
+        if tenant_id:
+            return self._by_tenant_id.get(tenant_id.strip().lower())
+        if host:
+            return self._by_domain.get(host.split(":", 1)[0].lower())
+        return None
+
+    def routes(self) -> List[TenantRoute]:
+        return list(self._by_oid.values())
+
+    def _reload_in_background(self):
+        """One reload at a time; callers keep using the current snapshot"""
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.create_task(self._reload_quietly())
+
+    async def _reload_quietly(self):
+        try:
+            await self.load(only_if_stale=True)
+        except PyMongoError as exc:
+            print(f"⚠️ Tenant registry reload failed: {exc}")
+
+    async def load(self, only_if_stale: bool = False):
+        """Replace the registry with a fresh read of the tenants collection"""
+        async with self._lock:
+            if only_if_stale and not self.is_stale():
+                return  # another request reloaded while we waited
+            cursor = Tenant.get_motor_collection().find({}, {name: 1 for name in ROUTE_FIELDS})
+            routes = [TenantRoute(doc) async for doc in cursor]
+            self._by_oid = {route.id: route for route in routes}
+            self._reindex()
+            self.synced_at = time.monotonic()
+
+    def apply(self, doc: dict):
+        route = TenantRoute(doc)
+        self._by_oid[route.id] = route
+        self._reindex()
+
+    def remove(self, oid: Any):
+        if self._by_oid.pop(oid, None) is not None:
+            self._reindex()
+
+    def _reindex(self):
+        # Rebuilt rather than patched so a changed domain/tenant_id drops its
+        # old key; tenant counts are small.
+        routes = list(self._by_oid.values())
+        self._by_tenant_id = {route.tenant_id.lower(): route for route in routes}
+        self._by_domain = {route.domain.lower(): route for route in routes if route.domain}
+
+    async def watch(self):
+        """Apply Tenant changes from a change stream until it fails"""
+        collection = Tenant.get_motor_collection()
+        async with collection.watch(
+            full_document="updateLookup",
+            max_await_time_ms=self.refresh_seconds * 1000
+        ) as stream:
+            # Load after opening the stream so no change falls in between
+            await self.load()
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    if change["operationType"] == "delete":
+                        self.remove(change["documentKey"]["_id"])
+                    elif change.get("fullDocument"):
+                        self.apply(change["fullDocument"])
+                    else:
+                        await self.load()
+                # try_next returns None after max_await_time_ms with no change
+                self.synced_at = time.monotonic()
+
+    async def run(self):
+        try:
+            await self.watch()
+        except PyMongoError as exc:
+            print(f"⚠️ Tenant change stream unavailable ({exc}); polling every {self.refresh_seconds}s")
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load()
+            except PyMongoError as exc:
+                print(f"⚠️ Tenant registry refresh failed: {exc}")
+
+    async def start(self):
+        await self.load()
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._reload is not None:
+            self._reload.cancel()
+            self._reload = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+tenant_registry = TenantRegistry(
+    refresh_seconds=settings.TENANT_REFRESH_SECONDS,
+    ttl_seconds=settings.TENANT_REGISTRY_TTL_SECONDS
+)
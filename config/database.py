@@ -40,7 +40,13 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 from contextlib import asynccontextmanager
-import os
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from beanie.odm.fields import IndexModelField
+from typing import Any, Dict, Set
+import asyncio
+
+from config.settings import settings
+from app.services.pool_stats import pool_stats
 
 # Import all your models
 from app.models.tenant import Tenant
@@ -51,18 +57,36 @@ from app.models.employee import Employee
 from app.models.user import User
 from app.models.role import Role
 from app.models.user_access import UserAccess
+from app.models.path_counter import PathCounter
+from app.models.hierarchy_closure import HierarchyClosure
 
 # MongoDB connection
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+MONGODB_URL = settings.MONGODB_URL  # Settings also reads the MONGODB_URL env var
 METADATA_DB = "hrms_metadata"
 
+# Documents stored in each tenant's database (routed per request)
+TENANT_MODELS = [
+    Company,
+    Department,
+    Branch,
+    Employee,
+    User,
+    Role,
+    UserAccess,
+    PathCounter,
+    HierarchyClosure
+]
+
 class Database:
     client: AsyncIOMotorClient = None
+    databases: Dict[str, AsyncIOMotorDatabase] = {}
+    initialized: Set[str] = set()
+    _init_lock: asyncio.Lock = None
     
     @classmethod
     async def connect_db(cls):
         """Connect to MongoDB"""
-        cls.client = AsyncIOMotorClient(MONGODB_URL)
+        cls.client = AsyncIOMotorClient(MONGODB_URL, **cls.client_options())
         
         # Initialize metadata database (for tenants)
         await init_beanie(
@@ -72,23 +96,70 @@ class Database:
         
         print(f"✅ Connected to MongoDB: {MONGODB_URL}")
     
+    @staticmethod
+    def client_options() -> Dict[str, Any]:
+        """Pool, compression, read preference and write concern from Settings"""
+        options: Dict[str, Any] = {
+            "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+            "maxConnecting": settings.MONGODB_MAX_CONNECTING,
+            "serverSelectionTimeoutMS": settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "readPreference": settings.MONGODB_READ_PREFERENCE,
+            "event_listeners": [pool_stats]
+        }
+        if settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS:
+            options["waitQueueTimeoutMS"] = settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+        if settings.MONGODB_COMPRESSORS:
+            options["compressors"] = settings.MONGODB_COMPRESSORS
+        if settings.MONGODB_WRITE_CONCERN:
+            w = settings.MONGODB_WRITE_CONCERN
+            options["w"] = int(w) if w.isdigit() else w
+        if settings.MONGODB_JOURNAL is not None:
+            options["journal"] = settings.MONGODB_JOURNAL
+        return options
+    
     @classmethod
     async def init_tenant_db(cls, database_name: str):
         """Initialize a specific tenant database"""
         await init_beanie(
             database=cls.client[database_name],
-            document_models=[
-                Company,
-                Department,
-                Branch,
-                Employee,
-                User,
-                Role,
-                UserAccess
-            ]
+            document_models=TENANT_MODELS
         )
+        cls.initialized.add(database_name)
         print(f"✅ Initialized tenant database: {database_name}")
     
+    @classmethod
+    async def tenant_database(cls, database_name: str) -> AsyncIOMotorDatabase:
+        """
+        Database handle for a tenant, sharing the single client's pool.
+        First use of a tenant only creates its indexes; models were set up
+        once by init_tenant_db and route per request (TenantRoutedMixin).
+        """
+        database = cls.databases.get(database_name)
+        if database is not None:
+            return database
+        
+        if cls._init_lock is None:
+            cls._init_lock = asyncio.Lock()
+        async with cls._init_lock:
+            if database_name not in cls.databases:
+                database = cls.client[database_name]
+                if database_name not in cls.initialized:
+                    await cls._create_indexes(database)
+                    cls.initialized.add(database_name)
+                    print(f"✅ Initialized tenant database: {database_name}")
+                cls.databases[database_name] = database
+        return cls.databases[database_name]
+    
+    @staticmethod
+    async def _create_indexes(database: AsyncIOMotorDatabase):
+        for model in TENANT_MODELS:
+            indexes = model.get_settings().indexes
+            if indexes:
+                await database[model.get_collection_name()].create_indexes(
+                    IndexModelField.list_to_index_model(indexes)
+                )
+    
     @classmethod
     async def close_db(cls):
         """Close database connection"""
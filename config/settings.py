@@ -2,6 +2,7 @@
 # FILE: config/settings.py
 # ============================================================
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 class Settings(BaseSettings):
     # App
@@ -10,11 +11,54 @@ class Settings(BaseSettings):
     
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
+    MONGODB_MAX_POOL_SIZE: int = 100  # Per server, per worker process
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_CONNECTING: int = 2  # Concurrent connection handshakes
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None  # Fail checkouts waiting longer
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGODB_COMPRESSORS: str = ""  # e.g. "zstd,snappy,zlib" (zstandard / python-snappy installed)
+    MONGODB_READ_PREFERENCE: str = "primary"
+    MONGODB_WRITE_CONCERN: Optional[str] = None  # "majority" or a node count; None = server default
+    MONGODB_JOURNAL: Optional[bool] = None
+    REPORTING_MAX_STALENESS_SECONDS: int = 120  # Hierarchy/report reads off the primary; 0 = primary
+    
+    # Tenancy
+    DEFAULT_TENANT_DATABASE: str = "tenant_techcorp"  # Initialized at startup
+    TENANT_FALLBACK_TO_DEFAULT: bool = True  # Serve unmatched hosts from the default
+    TENANT_HEADER: str = "X-Tenant-ID"
+    TENANT_REFRESH_SECONDS: int = 10  # Poll interval without change streams
+    TENANT_REGISTRY_TTL_SECONDS: int = 60  # Reload on lookup if not synced for this long
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    SCOPED_TOKENS_ENABLED: bool = False  # Embed identity + permission digest in tokens
+    TOKEN_REVOCATION_POLL_SECONDS: int = 5  # How fast other workers see revocations
+    
+    # Password hashing (bcrypt thread pool)
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # Waiting hashes before login returns 503
+    
+    # Caches
+    HIERARCHY_CACHE_TTL_SECONDS: int = 300  # 0 = only invalidate on writes
+    PERMISSION_CACHE_TTL_SECONDS: int = 60
+    PERMISSION_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Pagination
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 500
+    EXPORT_BATCH_SIZE: int = 1000  # Rows per cursor batch / streamed chunk
+    
+    # Hierarchy
+    HIERARCHY_CLOSURE_ENABLED: bool = False  # Maintain the ancestor closure table
+    
+    # Org chart
+    MAX_REPORTING_DEPTH: int = 10  # Deepest level /reporting-to-me will walk
+    ORG_GRAPH_TTL_SECONDS: int = 300  # Reporting graph reload; 0 = only on writes
+    HEADCOUNT_RECONCILE_SECONDS: int = 3600  # Full headcount/occupancy recount; 0 = never
     
     class Config:
         env_file = ".env"
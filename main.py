@@ -6,16 +6,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from config.database import Database
-from api.routes import auth, employees, companies
+from app.services.access_tokens import token_revocations
+from app.services.password_hasher import password_hasher
+from app.services.pool_stats import pool_stats
+from app.services.rollups import rollups
+from app.services.tenants import tenant_registry
+from config.settings import settings
+from api.middleware import TenantMiddleware
+from api.routes import auth, employees, companies, departments, branches
 from fastapi.staticfiles import StaticFiles
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await Database.connect_db()
-    await Database.init_tenant_db("tenant_techcorp")
+    await Database.init_tenant_db(settings.DEFAULT_TENANT_DATABASE)
+    await tenant_registry.start()
+    if settings.SCOPED_TOKENS_ENABLED:
+        token_revocations.start([token_revocations.tenant_key()])
+    rollups.start()
     yield
     # Shutdown
+    await rollups.stop()
+    await token_revocations.stop()
+    await tenant_registry.stop()
+    password_hasher.shutdown()
     await Database.close_db()
 
 app = FastAPI(
@@ -37,9 +52,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request tenant database binding
+app.add_middleware(TenantMiddleware)
+
 # Routes
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(employees.router, prefix="/api/employees", tags=["Employees"])
+app.include_router(departments.router, prefix="/api/departments", tags=["Departments"])
+app.include_router(branches.router, prefix="/api/branches", tags=["Branches"])
 
 @app.get("/")
 async def root():
@@ -47,4 +67,17 @@ async def root():
         "message": "HRMS MVP API",
         "version": "1.0.0",
         "docs": "/docs"
-    }
\ No newline at end of file
+    }
+
+@app.get("/health")
+async def health():
+    """Liveness plus worker-pool and Mongo connection-pool metrics"""
+    return {
+        "status": "ok",
+        "password_hasher": password_hasher.stats(),
+        "mongo_pool": {
+            "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+            "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+            "servers": pool_stats.snapshot()
+        }
+    }
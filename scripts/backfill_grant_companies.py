@@ -0,0 +1,62 @@
+# ============================================================
+# FILE: backfill_grant_companies.py
+# ============================================================
+"""
+Fill UserAccess.company_id on department/branch grants written before the
+field existed, from each holder's employer. Permission checks already fall
+back to the employer, but hierarchy moves only rewrite grants whose
+company_id matches the moved node's company. With no arguments the default
+tenant database is backfilled.
+
+    python -m scripts.backfill_grant_companies [database_name ...]
+"""
+import asyncio
+import sys
+
+from pymongo import UpdateOne
+
+from app.models.employee import Employee
+from app.models.tenant_routing import bind_database, primary_reads, reset_database
+from app.models.user import User
+from app.models.user_access import COMPANY_QUALIFIED_SCOPES, UserAccess
+from config.database import Database
+from config.settings import settings
+
+
+async def backfill_tenant(database_name: str):
+    token = bind_database(await Database.tenant_database(database_name))
+    try:
+        with primary_reads():
+            grants = UserAccess.get_motor_collection()
+            ops = [
+                UpdateOne({"_id": row["_id"]}, {"$set": {"company_id": row["company_id"]}})
+                async for row in grants.aggregate([
+                    {"$match": {"scope_type": {"$in": list(COMPANY_QUALIFIED_SCOPES)}, "company_id": None}},
+                    {"$lookup": {"from": User.get_collection_name(), "localField": "user_id",
+                                 "foreignField": "_id", "as": "user"}},
+                    {"$unwind": "$user"},
+                    {"$lookup": {"from": Employee.get_collection_name(), "localField": "user.employee_id",
+                                 "foreignField": "_id", "as": "employee"}},
+                    {"$unwind": "$employee"},
+                    {"$project": {"company_id": "$employee.company_id"}}
+                ])
+            ]
+            if ops:
+                await grants.bulk_write(ops, ordered=False)
+            print(f"✅ {database_name}: {len(ops)} grants pinned to their holder's company")
+    finally:
+        reset_database(token)
+
+
+async def main(database_names):
+    await Database.connect_db()
+    await Database.init_tenant_db(settings.DEFAULT_TENANT_DATABASE)
+    try:
+        for name in database_names or [settings.DEFAULT_TENANT_DATABASE]:
+            await backfill_tenant(name)
+    finally:
+        await Database.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,47 @@
+# ============================================================
+# FILE: rebuild_closure.py
+# ============================================================
+"""
+Backfill (or repair) the hierarchy closure table from parent links.
+Run once per tenant database before setting HIERARCHY_CLOSURE_ENABLED;
+with no arguments the default tenant database is rebuilt.
+
+    python -m scripts.rebuild_closure [database_name ...]
+"""
+import asyncio
+import sys
+
+from app.models.branch import Branch
+from app.models.company import Company
+from app.models.department import Department
+from app.models.tenant_routing import bind_database, primary_reads, reset_database
+from app.services import closure
+from config.database import Database
+from config.settings import settings
+
+HIERARCHIES = [Company, Department, Branch]
+
+
+async def rebuild_tenant(database_name: str):
+    token = bind_database(await Database.tenant_database(database_name))
+    try:
+        with primary_reads():
+            for model in HIERARCHIES:
+                rows = await closure.rebuild(model)
+                print(f"✅ {database_name}.{model.get_collection_name()}: {rows} closure rows")
+    finally:
+        reset_database(token)
+
+
+async def main(database_names):
+    await Database.connect_db()
+    await Database.init_tenant_db(settings.DEFAULT_TENANT_DATABASE)
+    try:
+        for name in database_names or [settings.DEFAULT_TENANT_DATABASE]:
+            await rebuild_tenant(name)
+    finally:
+        await Database.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
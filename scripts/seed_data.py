@@ -8,7 +8,6 @@ Run: python seed_data.py
 import asyncio
 from datetime import datetime
 from bson import ObjectId
-import bcrypt
 
 from config.database import Database
 from app.models.tenant import Tenant
@@ -19,10 +18,11 @@ from app.models.employee import Employee
 from app.models.user import User
 from app.models.role import Role
 from app.models.user_access import UserAccess
+from app.services.password_hasher import password_hasher
 
 async def hash_password(password: str) -> str:
-    """Hash password"""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    """Hash password (on the shared bcrypt pool)"""
+    return await password_hasher.hash(password)
 
 async def seed_all():
     """Seed complete demo data"""